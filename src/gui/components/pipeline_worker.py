@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+from lib.pipeline import Pipeline, Stage
+from lib.progress import Progress, Cancelled
+
+from PyQt6.QtCore import *
+
+import logging
+
+
+
+class PipelineWorker(QThread):
+    """ Runs a pipeline in a background thread; the results are delivered by signals (in the GUI thread) """
+
+
+    progressChanged = pyqtSignal(str, float)  # message, and completed fraction (or -1 if unknown)
+    succeeded = pyqtSignal(object)  # the figure
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+
+    def __init__(self, pipeline: Pipeline, until: Stage, parent: QObject = None):
+        super().__init__(parent)
+        self.until = until
+        self._pipeline = pipeline
+        self._snap = pipeline.config.snapshot()  # taken in the GUI thread; the config may change while running
+        self._progress = Progress(lambda message,fraction: self.progressChanged.emit(message, -1.0 if fraction is None else fraction))
+
+
+    def cancel(self):
+        self._progress.cancel()
+
+
+    def run(self):
+        try:
+            figure = self._pipeline.run(until=self.until, progress=self._progress, snap=self._snap)
+            self.succeeded.emit(figure)
+        except Cancelled:
+            logging.info('Cancelled')
+            self.cancelled.emit()
+        except Exception as ex:
+            logging.error(f'Plot update failed ({ex})')
+            self.failed.emit(str(ex))
@@ -160,7 +160,7 @@ class PivotGrid(QWidget):
 
         def _update_data(self):
             # a change in the user-role data will trigger a re-draw
-            self.setData(Qt.ItemDataRole.UserRole, (self.col, self._role, self._role_index, hash(self._setup())))
+            self.setData(Qt.ItemDataRole.UserRole, (self.col, self._role, self._role_index, self._config.version))
         
         def context_menu(self) -> QMenu|None:
             if self._role != ColumnRole.Unassigned:
@@ -209,11 +209,12 @@ class PivotGrid(QWidget):
                     text2_items.append('↑')
             usages = []
             if role != ColumnRole.Unassigned:
-                if len([sw for sw in self._config.get_switches(ColumnRole.Group) if sw.col==col and sw.active]) > 0:
+                active_roles = self._config.get_active_roles(col)
+                if ColumnRole.Group in active_roles:
                     usages.append('G')
-                if len([sw for sw in self._config.get_switches(ColumnRole.X) if sw.col==col and sw.active]) > 0:
+                if ColumnRole.X in active_roles:
                     usages.append('X')
-                if len([sw for sw in self._config.get_switches(ColumnRole.Y) if sw.col==col and sw.active]) > 0:
+                if ColumnRole.Y in active_roles:
                     usages.append('Y')
             if setup.as_color:
                 usages.append('C')
@@ -501,7 +502,7 @@ class PivotGrid(QWidget):
 
     @property
     def _need_z(self) -> bool:
-        return self._config.plot.type in [PlotType.Scatter3D]
+        return self._config.plot.type in [PlotType.Scatter3D, PlotType.Heatmap, PlotType.Raster]
 
 
     def _update_layout(self):
@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+from lib.figure_diff import diff_figures
+from lib import typed_json
+
+from PyQt6 import QtCore, QtGui, QtWidgets
+from PyQt6.QtWebEngineWidgets import QWebEngineView
+from PyQt6.QtWebChannel import QWebChannel
+from PyQt6.QtCore import *
+from PyQt6.QtGui import *
+from PyQt6.QtWidgets import *
+
+import os
+import json
+import logging
+import numpy as np
+import plotly
+import plotly.graph_objects as go
+
+
+
+class PlotView(QWebEngineView):
+    """ Shows Plotly figures in a persistent web page.
+
+    The page (including the locally bundled plotly.js) is only loaded once; figures are then pushed by
+    Plotly.react(), or, if only some properties have changed, by Plotly.restyle() and Plotly.relayout().
+    """
+
+
+    rangeChanged = pyqtSignal(object, object)  # X- and Y-range: tuple (v0,v1), or None for the full range
+
+
+    class Bridge(QObject):
+        """ Receives events from the JavaScript side of the web page """
+
+        relayout = pyqtSignal(str)
+
+        @pyqtSlot(str)
+        def on_relayout(self, event_json: str):
+            self.relayout.emit(event_json)
+
+
+    PAGE = '''<!DOCTYPE html>
+        <html>
+        <head>
+            <meta charset="utf-8">
+            <script type="text/javascript" src="plotly.min.js"></script>
+            <script type="text/javascript">{qwebchannel_js}</script>
+            <style>
+                html, body {{ margin: 0; height: 100%; overflow: hidden; font-family: sans-serif; }}
+                #plot {{ width: 100%; height: 100%; }}
+                #message {{ position: absolute; inset: 0; padding: 1em; background: white; z-index: 10; }}
+            </style>
+        </head>
+        <body>
+            <div id="message">Loading...</div>
+            <div id="plot"></div>
+            <script type="text/javascript">
+                var cdvPlot = document.getElementById('plot');
+                var cdvBridge = null;
+                var cdvConnected = false;
+                if (typeof QWebChannel !== 'undefined') {{
+                    new QWebChannel(qt.webChannelTransport, function(channel) {{ cdvBridge = channel.objects.bridge; }});
+                }}
+                function cdvRelayout(event) {{
+                    if (cdvBridge) {{ cdvBridge.on_relayout(JSON.stringify(event)); }}
+                }}
+                function cdvShowMessage(text) {{
+                    var message = document.getElementById('message');
+                    message.textContent = text;
+                    message.style.display = 'block';
+                }}
+                function cdvRequeryZoomedRange() {{
+                    // the zoom is kept when the data is replaced, so the zoomed-in data must be re-queried
+                    var event = {{}};
+                    ['xaxis', 'yaxis'].forEach(function(name) {{
+                        var axis = cdvPlot.layout ? cdvPlot.layout[name] : null;
+                        if (axis && !axis.autorange && axis.range) {{
+                            event[name + '.range'] = axis.range;
+                        }}
+                    }});
+                    if (Object.keys(event).length > 0) {{
+                        cdvRelayout(event);
+                    }}
+                }}
+                function cdvReact(fig) {{
+                    document.getElementById('message').style.display = 'none';
+                    Plotly.react(cdvPlot, fig.data, fig.layout, {{responsive: true}}).then(function() {{
+                        if (!cdvConnected) {{
+                            cdvPlot.on('plotly_relayout', cdvRelayout);
+                            cdvConnected = true;
+                        }}
+                        cdvRequeryZoomedRange();
+                    }});
+                }}
+                function cdvUpdate(restyles, relayout, requery) {{
+                    document.getElementById('message').style.display = 'none';
+                    for (var i = 0; i < restyles.length; i++) {{
+                        Plotly.restyle(cdvPlot, restyles[i][1], [restyles[i][0]]);
+                    }}
+                    if (Object.keys(relayout).length > 0) {{
+                        Plotly.relayout(cdvPlot, relayout);
+                    }}
+                    if (requery && restyles.length > 0) {{
+                        cdvRequeryZoomedRange();
+                    }}
+                }}
+            </script>
+        </body>
+        </html>
+    '''
+
+
+    RANGE_DEBOUNCE_MS = 100
+
+
+    def __init__(self, parent: QWidget = None):
+        super().__init__(parent)
+
+        self._bridge = PlotView.Bridge()
+        self._bridge.relayout.connect(self._on_relayout)
+        self._channel = QWebChannel(self.page())
+        self._channel.registerObject('bridge', self._bridge)
+        self.page().setWebChannel(self._channel)
+
+        self._ranges = dict(xaxis=None, yaxis=None)
+        self._range_timer = QTimer(self)
+        self._range_timer.setSingleShot(True)
+        self._range_timer.setInterval(PlotView.RANGE_DEBOUNCE_MS)
+        self._range_timer.timeout.connect(lambda: self.rangeChanged.emit(self._ranges['xaxis'], self._ranges['yaxis']))
+
+        self._page_ready = False
+        self._pending_scripts: list[str] = []
+        self._shown_figure: dict|None = None
+        self.loadFinished.connect(self._on_load_finished)
+        self._load_page()
+
+
+    @staticmethod
+    def _load_qwebchannel_js() -> str:
+        file = QFile(':/qtwebchannel/qwebchannel.js')
+        if not file.open(QIODevice.OpenModeFlag.ReadOnly):
+            logging.warning('Unable to load qwebchannel.js; zooming will not re-query data')
+            return ''
+        try:
+            return bytes(file.readAll()).decode('utf-8')
+        finally:
+            file.close()
+
+
+    def _load_page(self):
+        plotly_js_dir = os.path.join(os.path.dirname(plotly.__file__), 'package_data')
+        page = PlotView.PAGE.format(qwebchannel_js=PlotView._load_qwebchannel_js())
+        self.setHtml(page, QUrl.fromLocalFile(plotly_js_dir + os.sep))
+
+
+    def _on_load_finished(self, ok: bool):
+        if not ok:
+            logging.error('Unable to load plot page')
+            return
+        self._page_ready = True
+        for script in self._pending_scripts:
+            self.page().runJavaScript(script)
+        self._pending_scripts.clear()
+
+
+    def _run_script(self, script: str, *, replaces_pending: bool = False):
+        if self._page_ready:
+            self.page().runJavaScript(script)
+        else:
+            if replaces_pending:
+                self._pending_scripts.clear()
+            self._pending_scripts.append(script)
+
+
+    @staticmethod
+    def _to_json(obj) -> str:
+        return typed_json.to_json(obj)
+
+
+    def setFigure(self, fig: dict|go.Figure):
+        new_figure = fig.to_plotly_json() if isinstance(fig, go.Figure) else fig
+        diff = diff_figures(self._shown_figure, new_figure)
+        self._shown_figure = new_figure
+
+        if diff is None:
+            self._ranges = dict(xaxis=None, yaxis=None)  # the page reports the kept zoom again after drawing
+            self._run_script(f'cdvReact({self._to_json(new_figure)});', replaces_pending=True)
+        else:
+            restyles, relayout = diff
+            if len(restyles) == 0 and len(relayout) == 0:
+                self._run_script(f'cdvUpdate([], {{}}, false);')  # only hide the message
+                return
+            restyles = [(index, {path: [value] for path,value in changes.items()}) for index,changes in restyles]
+            self._run_script(f'cdvUpdate({self._to_json(restyles)}, {self._to_json(relayout)}, true);')
+
+
+    def setMessage(self, message: str):
+        self._run_script(f'cdvShowMessage({json.dumps(message)});')
+
+
+    def updateTraces(self, updates: list[tuple[int,dict]], relayout: dict = {}):
+        """ Replaces data of existing traces; <updates> is a list of (trace-index, {property-path: data}), <relayout> a dict {property-path: value} """
+        if len(updates) < 1 and len(relayout) < 1:
+            return
+        restyles = [(index, {path: [value] for path,value in data.items()}) for index,data in updates]
+        self._run_script(f'cdvUpdate({self._to_json(restyles)}, {self._to_json(relayout)}, false);')
+
+
+    @staticmethod
+    def _parse_axis_value(value) -> float|np.datetime64:
+        """ Date axes report their range as strings like "2024-01-31 12:00:00.5" """
+        if isinstance(value, str):
+            try:
+                return float(value)
+            except ValueError:
+                return np.datetime64(value.strip().replace(' ', 'T'))
+        return float(value)
+
+
+    def _on_relayout(self, event_json: str):
+        try:
+            event = json.loads(event_json)
+        except Exception as ex:
+            logging.warning(f'Unable to parse relayout event ({ex})')
+            return
+
+        changed = False
+        for axis in ['xaxis', 'yaxis']:
+            if event.get(f'{axis}.autorange'):
+                axis_range = None
+            elif f'{axis}.range[0]' in event and f'{axis}.range[1]' in event:
+                axis_range = (event[f'{axis}.range[0]'], event[f'{axis}.range[1]'])
+            elif f'{axis}.range' in event:
+                axis_range = tuple(event[f'{axis}.range'])
+            else:
+                continue  # range of this axis not changed
+
+            try:
+                if axis_range is not None:
+                    axis_range = (PlotView._parse_axis_value(axis_range[0]), PlotView._parse_axis_value(axis_range[1]))
+            except (TypeError, ValueError):
+                logging.debug(f'Unable to re-query the range {axis_range} of {axis}')
+                continue  # e.g. a category axis
+
+            self._ranges[axis] = axis_range
+            changed = True
+
+        if changed:
+            self._range_timer.start()
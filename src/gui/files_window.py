@@ -33,26 +33,12 @@ class FilesWindow(FilesWindowUi):
 
     def load_files(self, *, select_config_files: bool):
         try:
-            if not self.config.input.glob_dir:
-                raise RuntimeError(f'No directory defined')
-            
-            rex_include = re.compile(self.config.input.glob_regex_include) if self.config.input.glob_regex_include else None
-            rex_exclude = re.compile(self.config.input.glob_regex_exclude) if self.config.input.glob_regex_exclude else None
-            
-            all_files = []
-            selected_files = []
-            for path in sorted(pathlib.Path(self.config.input.glob_dir).glob(self.config.input.glob_pattern)):
-                all_files.append(path)
-                if not select_config_files:
-                    if rex_include and not rex_include.match(path.name):
-                        continue
-                    if rex_exclude and rex_exclude.match(path.name):
-                        continue
-                    selected_files.append(path)
+            all_files = self.config.input.find_files(apply_regex=False)
             
             if select_config_files:
                 selected_files = [pathlib.Path(f) for f in self.config.input.files]
             else:
+                selected_files = self.config.input.find_files()
                 self.config.input.files = [str(path) for path in selected_files]
             
             self.ui_set_files(all_files, selected_files)
@@ -23,6 +23,7 @@ class MainWindow(MainWindowUi):
         PlotType.Heatmap: 'Heatmap',
         PlotType.Scatter3D: '3D Scatter',
         PlotType.StatMatrix: 'Stat Matrix',
+        PlotType.Raster: 'Raster',
     }
 
 
@@ -94,6 +95,7 @@ class MainWindow(MainWindowUi):
         df = df.with_row_index(name='_row_id')
 
         self.config.raw_df = df.collect()
+        self.config.ensure_setups_exist()
     
 
     def apply_filters_and_sorting(self):
@@ -1,6 +1,7 @@
 from .files_window import FilesWindow
 from .plot_window import PlotWindow
 from lib.config import Config
+from lib.session import Session
 
 from PyQt6 import QtCore, QtGui, QtWidgets
 from PyQt6.QtWebEngineWidgets import QWebEngineView
@@ -27,3 +28,8 @@ class MainWindowManager:
     def show_plot(self, config: Config):
         self._files_window.hide()
         self._plot_window.show(config)
+
+    
+    def show_session(self, session: Session):
+        self._files_window.hide()
+        self._plot_window.show_session(session)
@@ -2,8 +2,10 @@ from .plot_window_ui import PlotWindowUi
 from .filter_dialog import FilterDialog
 from lib.config import Config, Relation, Sort, FilterMode, ColumnRole, PlotType
 from lib.utils import reverse_lookup
-from lib.shortstr import shorten_string_list
-from lib.plot import Plot
+from lib.pipeline import Pipeline, Stage
+from lib.figure_cache import FigureCache
+from lib.session import Session, EXTENSION as SESSION_EXTENSION
+from .components.pipeline_worker import PipelineWorker
 
 import os, pathlib
 import sys
@@ -25,6 +27,7 @@ class PlotWindow(PlotWindowUi):
         PlotType.Heatmap: 'Heatmap',
         PlotType.Scatter3D: '3D Scatter',
         PlotType.StatMatrix: 'Stat Matrix',
+        PlotType.Raster: 'Raster',
     }
 
 
@@ -33,24 +36,69 @@ class PlotWindow(PlotWindowUi):
         self._callback_plot = callback_plot
         self.ui_set_plottype_options(PlotWindow.PLOTTYPE_NAMES.values())
         self.config: Config = None
+        self._pipeline: Pipeline = None
+        self._figure_cache = FigureCache()
+        self._worker: PipelineWorker|None = None
+        self._pending_run: tuple[Stage,Callable]|None = None
         
 
     def show(self, config: Config):
         self.config = config
+        self._pipeline = Pipeline(self.config, self._figure_cache)
 
         try:
             self.update_ui_from_config()
-            self.load_files()
-            self.ui_pivot_grid().setConfig(self.config)
-            self.apply_filters_and_sorting()
-            self.update_plot()
-
-            self.config.autosave()
+            self.ui_plot('Loading...')
+            self._run_pipeline(Stage.Load, self._on_loaded)
         
         except Exception as ex:
             logging.error(f'Unable to load ({ex})')
         
         super().show()
+
+
+    def show_session(self, session: Session):
+        if session.figure is not None and session.fingerprint:
+            self._figure_cache.put(session.fingerprint, session.figure, None)
+        self.show(session.config)
+
+
+    def _on_loaded(self, _):
+        self.ui_pivot_grid().setConfig(self.config)
+        self.update_plot()
+        self.config.autosave()
+
+
+    def _run_pipeline(self, until: Stage, on_success: Callable):
+        """ Runs the pipeline in the background; if it is already running, it is restarted (unless it is still loading) """
+        if self._worker is not None:
+            if self._worker.until != Stage.Load:
+                self._worker.cancel()
+            self._pending_run = (until, on_success)
+            return
+        
+        worker = PipelineWorker(self._pipeline, until, self)
+        worker.progressChanged.connect(self.ui_show_progress)
+        worker.succeeded.connect(self._on_pipeline_succeeded)
+        worker.succeeded.connect(on_success)
+        worker.failed.connect(self.ui_plot)
+        worker.finished.connect(self._on_worker_finished)
+        self._worker = worker
+        self.ui_show_progress('Preparing...', None)
+        worker.start()
+
+
+    def _on_pipeline_succeeded(self, _):
+        self.config.ensure_setups_exist()  # for newly loaded columns; the pipeline does not change the config itself
+
+
+    def _on_worker_finished(self):
+        self._worker.deleteLater()
+        self._worker = None
+        self.ui_hide_progress()
+        if self._pending_run is not None:
+            (until, on_success), self._pending_run = self._pending_run, None
+            self._run_pipeline(until, on_success)
     
 
     def update_ui_from_config(self):
@@ -58,107 +106,9 @@ class PlotWindow(PlotWindowUi):
         self.ui_set_plottype(PlotWindow.PLOTTYPE_NAMES[self.config.plot.type])
 
     
-    def load_files(self):
-        
-        file_names = shorten_string_list([pathlib.Path(path).name for path in self.config.input.files])
-
-        dfs = []
-        for path,name in zip(self.config.input.files,file_names):
-            try:
-                logging.info(f'Loading <{path}>')
-                comment_list = []
-                with open(path, 'r') as fp:
-                    for line in fp.readlines():
-                        if line.startswith('#'):
-                            comment_list.append(line.strip())
-                comment = '\n'.join(comment_list)
-                df = pl.scan_csv(path, comment_prefix='#', separator=self.config.input.csv_separator)
-                #print(df)
-                df = df.with_columns([
-                    pl.lit(comment).alias('_file_comment'),
-                    pl.lit(name).alias('_file_name'),
-                    pl.lit(path).alias('_file_path'),
-                    pl.lit(len(dfs)).alias('_file_id'),
-                ])
-                df = df.with_row_index(name='_file_row_id')
-                dfs.append(df)
-            except Exception as ex:
-                logging.error(f'Loading <{path}> failed ({ex})')
-        
-        if len(dfs) == 1:
-            df = dfs[0]
-        elif len(dfs) > 1:
-            df = pl.concat(dfs)
-        else:
-            df = pl.LazyFrame()
-        df = df.with_row_index(name='_row_id')
-
-        self.config.raw_df = df.collect()
-    
-
-    def apply_filters_and_sorting(self):
-
-        conditions = None
-        sort_cols, sort_desc = [], []
-
-        # TODO: the sorting should depend on the order in those 3 roles
-
-        for col_setup in self.config.col_setups:
-            if col_setup.col not in self.config.all_columns:
-                logging.warning(f'Ignoring setup of non-existing column "{col_setup.col}"')
-                continue
-            
-            condition = None
-            if col_setup.filter.mode == FilterMode.Expression:
-                raise NotImplementedError('Expression filtering is not implemented yet')
-            elif col_setup.filter.mode == FilterMode.Comparison:
-                match col_setup.filter.cmp_rel:
-                    case Relation.Equal: condition = pl.col(col_setup.col)==col_setup.filter.cmp_value
-                    case Relation.NotEqual: condition = pl.col(col_setup.col)!=col_setup.filter.cmp_value
-                    case Relation.Greater: condition = pl.col(col_setup.col)>col_setup.filter.cmp_value
-                    case Relation.GreaterOrEqual: condition = pl.col(col_setup.col)>=col_setup.filter.cmp_value
-                    case Relation.Less: condition = pl.col(col_setup.col)<col_setup.filter.cmp_value
-                    case Relation.LessOrEqual: condition = pl.col(col_setup.col)<=col_setup.filter.cmp_value
-                    case Relation.In: condition = pl.col(col_setup.col).is_between(col_setup.filter.cmp_value,col_setup.filter.cmp_value2,closed='both')
-                    case Relation.NotIn: condition = ~pl.col(col_setup.col).is_between(col_setup.filter.cmp_value,col_setup.filter.cmp_value2,closed='both')
-                    case _: raise ValueError()
-            elif col_setup.filter.mode == FilterMode.Selection:
-                condition = pl.col(col_setup.col).is_in(col_setup.filter.selection)
-            elif col_setup.filter.mode == FilterMode.Off:
-                pass
-            else: raise ValueError()
-            if condition is not None:
-                if conditions is None:
-                    conditions = condition
-                else:
-                    conditions = conditions & (condition)
-        
-        for role in [ColumnRole.Y, ColumnRole.X, ColumnRole.Group]:
-            for switch in self.config.get_switches(role):
-                col = switch.col
-                setup = self.config.find_setup(col)
-                if setup.sort == Sort.Asc:
-                    sort_cols.append(setup.col)
-                    sort_desc.append(False)
-                if setup.sort == Sort.Desc:
-                    sort_cols.append(setup.col)
-                    sort_desc.append(True)
-        
-        df = self.config.raw_df.lazy()
-        if conditions is not None:
-            df = df.filter(conditions)
-        if len(sort_cols) >= 1:
-            logging.info(f'Sorting by {sort_cols}')
-            df = df.sort(by=sort_cols, descending=sort_desc)
-        self.config.df = df.collect()
-        logging.info(f'Dataframe shape: {self.config.df.shape}')
-
-
     def update_plot(self):
         try:
-            self.ui_plot('Preparing...')
-            fig = Plot(self.config).plot()
-            self.ui_plot(fig)
+            self._run_pipeline(Stage.Plot, self.ui_plot)
         except Exception as ex:
             logging.error(f'Plot update failed ({ex})')
             self.ui_plot(str(ex))
@@ -166,7 +116,6 @@ class PlotWindow(PlotWindowUi):
 
     def need_re_render(self):
         try:
-            self.apply_filters_and_sorting()
             self.update_plot()
             self.config.autosave()
         except Exception as ex:
@@ -177,6 +126,15 @@ class PlotWindow(PlotWindowUi):
         self.need_re_render()
 
 
+    def on_plot_range_change(self, x_range: tuple[float,float]|None, y_range: tuple[float,float]|None):
+        if self._worker is not None:
+            return  # the plot is being replaced anyway
+        try:
+            self.ui_update_traces(*self._pipeline.requery(x_range, y_range))
+        except Exception as ex:
+            logging.error(f'Re-querying plot data failed ({ex})')
+
+
     def on_lines_change(self):
         self.config.plot.scatter_lines = self.ui_get_lines()
         self.need_re_render()
@@ -192,8 +150,26 @@ class PlotWindow(PlotWindowUi):
         self._callback_plot(self.config)
 
 
+    def on_cancel(self):
+        self._pending_run = None
+        if self._worker is not None:
+            self._worker.cancel()
+            self.ui_plot('Cancelled')
+
+
     def on_save(self):
         try:
             self.config.save(self.config.filename)
         except Exception as ex:
             logging.error(f'Saving failed ({ex})')
+
+
+    def on_save_session(self):
+        default_path = str(pathlib.Path(self.config.filename).with_suffix(SESSION_EXTENSION)) if self.config.filename else ''
+        path = self.ui_get_save_path(default_path, f'Sessions (*{SESSION_EXTENSION})')
+        if not path:
+            return
+        try:
+            Session.save(path, self.config, self._pipeline.figure, self._pipeline.figure_fingerprint)
+        except Exception as ex:
+            logging.error(f'Saving session failed ({ex})')
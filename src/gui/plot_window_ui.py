@@ -1,5 +1,6 @@
 from .helpers.qt_helper import QtHelper
 from .components.pivot_grid import PivotGrid
+from .components.plot_view import PlotView
 
 from PyQt6 import QtCore, QtGui, QtWidgets
 from PyQt6.QtWebEngineWidgets import QWebEngineView
@@ -18,10 +19,12 @@ class PlotWindowUi(QMainWindow):
         super().__init__()
         self.setWindowTitle('Configurable Data Visualizer')
 
-        self._ui_webview = QWebEngineView(parent=self)
+        self._ui_webview = PlotView(parent=self)
         self._ui_webview.setMinimumSize(500,300)
+        self._ui_webview.rangeChanged.connect(self.on_plot_range_change)
         self._ui_files_button = QtHelper.make_toolbutton(self, 'Files...', self.on_files)
         self._ui_save_button = QtHelper.make_toolbutton(self, 'Save', self.on_save)
+        self._ui_save_session_button = QtHelper.make_toolbutton(self, 'Save Session...', self.on_save_session, tooltip='Save the config together with the loaded data, for instant re-opening')
         self._ui_lines_cb = QtHelper.make_toolbutton(self, 'Lines', self.on_lines_change, checked=True)
         self._ui_plottype_combo = QComboBox()
         self._ui_plottype_combo.currentIndexChanged.connect(self.on_plottype_change)
@@ -33,12 +36,19 @@ class PlotWindowUi(QMainWindow):
         
         self._ui_splitter = QSplitter(Qt.Orientation.Horizontal, self)
         self._ui_splitter.addWidget(QtHelper.layout_widget_v(
-            QtHelper.layout_h(self._ui_save_button, self._ui_files_button, self._ui_lines_cb, self._ui_plottype_combo, self._ui_label, ...),
+            QtHelper.layout_h(self._ui_save_button, self._ui_save_session_button, self._ui_files_button, self._ui_lines_cb, self._ui_plottype_combo, self._ui_label, ...),
             self._ui_webview
         ))
         self._ui_splitter.addWidget(self._ui_pivot_grid)
         self._ui_splitter.setStretchFactor(0, 5)
         self.setCentralWidget(QtHelper.layout_widget_h(self._ui_splitter))
+
+        self._ui_progress_bar = QProgressBar()
+        self._ui_progress_bar.setMaximumWidth(200)
+        self._ui_cancel_button = QtHelper.make_toolbutton(self, 'Cancel', self.on_cancel)
+        self.statusBar().addPermanentWidget(self._ui_progress_bar)
+        self.statusBar().addPermanentWidget(self._ui_cancel_button)
+        self.ui_hide_progress()
         
         self.ui_set_label(None)
         self.resize(900, 800)
@@ -49,13 +59,16 @@ class PlotWindowUi(QMainWindow):
 
 
     def ui_plot(self, content):
-        if isinstance(content, go.Figure):
-            htm = content.to_html(include_plotlyjs='cdn', full_html=True)
-            self._ui_webview.setHtml(htm)
+        if isinstance(content, (dict,go.Figure)):
+            self._ui_webview.setFigure(content)
         elif isinstance(content, str):
-            self._ui_webview.setHtml(f'<html><body><p>{content}</p></body></html>')
+            self._ui_webview.setMessage(content)
         else:
-            self._ui_webview.setHtml('<html><body><p>No Plot</p></body></html>')
+            self._ui_webview.setMessage('No Plot')
+
+
+    def ui_update_traces(self, updates: list[tuple[int,dict]], relayout: dict = {}):
+        self._ui_webview.updateTraces(updates, relayout)
 
     
     def ui_set_label(self, value: str):
@@ -66,6 +79,26 @@ class PlotWindowUi(QMainWindow):
             self._ui_label.setVisible(False)
     
 
+    def ui_show_progress(self, message: str, fraction: float|None):
+        self.statusBar().showMessage(message)
+        if fraction is None or fraction < 0:
+            self._ui_progress_bar.setRange(0, 0)  # busy indicator
+        else:
+            self._ui_progress_bar.setRange(0, 1000)
+            self._ui_progress_bar.setValue(int(fraction * 1000))
+        self._ui_progress_bar.setVisible(True)
+        self._ui_cancel_button.setVisible(True)
+    def ui_hide_progress(self):
+        self.statusBar().clearMessage()
+        self._ui_progress_bar.setVisible(False)
+        self._ui_cancel_button.setVisible(False)
+    
+
+    def ui_get_save_path(self, default_path: str, filter: str) -> str|None:
+        path, _ = QFileDialog.getSaveFileName(self, 'Save', default_path, filter)
+        return path or None
+    
+
     def ui_get_plottype(self) -> str:
         return self._ui_plottype_combo.currentText()
     def ui_set_plottype_options(self, options: list[str]):
@@ -91,6 +124,8 @@ class PlotWindowUi(QMainWindow):
 
     def on_pivot_change(self):
         pass
+    def on_plot_range_change(self, x_range: tuple[float,float]|None, y_range: tuple[float,float]|None):
+        pass
     def on_lines_change(self):
         pass
     def on_plottype_change(self):
@@ -99,3 +134,7 @@ class PlotWindowUi(QMainWindow):
         pass
     def on_save(self):
         pass
+    def on_save_session(self):
+        pass
+    def on_cancel(self):
+        pass
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import time
+import atexit
+import logging
+import threading
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from .base_config import BaseConfig
+
+
+
+class Autosaver:
+    """ Saves configs in a background thread, once no further save was requested for <delay> seconds.
+
+    A read-only snapshot is taken when the save is requested, so the config can be modified while it is being written.
+    Requests are skipped if the same config was already saved (or is pending) with the same version. Pending saves
+    are flushed when the interpreter exits.
+    """
+
+
+    def __init__(self, delay: float = 1.0):
+        self._delay = delay
+        self._condition = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._pending: dict[str,BaseConfig] = {}  # snapshots by path
+        self._requested: dict[str,tuple[BaseConfig,int]] = {}  # the config and its version, by path
+        self._due = 0.0
+        self._thread: threading.Thread|None = None
+        atexit.register(self.flush)
+
+
+    def request(self, path: str, config: BaseConfig):
+        with self._condition:
+            if path in self._requested:
+                (requested_config, requested_version) = self._requested[path]
+                if requested_config is config and requested_version == config.version:
+                    return  # unchanged
+            self._requested[path] = (config, config.version)
+            self._pending[path] = config.snapshot()
+            self._due = time.monotonic() + self._delay
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='Autosaver', daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+
+    def flush(self):
+        """ Writes all pending saves immediately """
+        with self._condition:
+            pending, self._pending = self._pending, {}
+        self._write(pending)
+
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while len(self._pending) == 0 or time.monotonic() < self._due:
+                    self._condition.wait(None if len(self._pending) == 0 else self._due - time.monotonic())
+                pending, self._pending = self._pending, {}
+            self._write(pending)
+
+
+    def _write(self, pending: dict[str,BaseConfig]):
+        with self._write_lock:
+            for path,snap in pending.items():
+                try:
+                    t = time.perf_counter()
+                    snap.save(path)
+                    logging.debug(f'Auto-saved <{path}> in {time.perf_counter()-t:.3f}s')
+                except Exception as ex:
+                    logging.warning(f'Auto-saving <{path}> failed ({ex})')
+
+
+
+_autosaver: Autosaver|None = None
+
+
+def get_autosaver() -> Autosaver:
+    global _autosaver
+    if _autosaver is None:
+        _autosaver = Autosaver()
+    return _autosaver
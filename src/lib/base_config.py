@@ -1,15 +1,177 @@
 from __future__ import annotations
 
+import os
 import json
+import stat
 import logging
-import inspect
+import tempfile
 import typing
 import enum
-from typing import Self, Type, Any, overload
+from typing import Self, Type, Any, Callable, overload
 
 
 
-class BaseConfig:
+class ConfigField:
+    """ Describes a member of a config class: its default, and how it is (de-)serialized """
+
+    __slots__ = ('name', 'typ', 'default', 'volatile', 'nested', 'serialize', 'deserialize')
+
+
+    def __init__(self, name: str, typ: Type, default: Any):
+        self.name = name
+        self.typ = typ
+        self.volatile = isinstance(default, BaseConfig.Volatile)
+        self.default = default.wrapped if self.volatile else default
+        self.nested = typing.get_origin(typ) is list or (isinstance(typ, type) and issubclass(typ, BaseConfig))  # lists or configs, which must be adopted
+        self.serialize, self.deserialize = ConfigField._compile(name, typ)
+
+
+    def make_default(self) -> Any:
+        """ Returns the default value; mutable defaults (lists and configs) are copied, so that they are never shared between instances """
+        if isinstance(self.default, list):
+            return [element.copy() if isinstance(element, BaseConfig) else element for element in self.default]
+        elif isinstance(self.default, BaseConfig):
+            return self.default.copy()
+        return self.default
+
+
+    @staticmethod
+    def _compile(name: str, typ: Type) -> tuple[Callable[[Any],Any], Callable[[Any],Any]]:
+
+        def compile_plain(typ: Type) -> tuple[Callable[[Any],Any], Callable[[Any],Any]]:
+            if isinstance(typ, type) and issubclass(typ, BaseConfig):
+                return (lambda obj: obj._serialize()), typ._deserialize
+            if typ is typing.Any:
+                return None, None  # passed through as-is
+            def cast(data):
+                if data is None:
+                    return None
+                try:
+                    return typ(data)
+                except Exception as ex:
+                    logging.warning(f'Cannot cast >{data}> to <{typ}> for config "{name}"; ignoring')
+                    return None
+            return None, cast
+
+        if typing.get_origin(typ) is list:
+            serialize_element, deserialize_element = compile_plain(typing.get_args(typ)[0])
+            serialize = (lambda obj: [serialize_element(element) for element in obj]) if serialize_element else list
+            deserialize = (lambda data: [deserialize_element(element) for element in data]) if deserialize_element else list
+            return serialize, deserialize
+
+        serialize, deserialize = compile_plain(typ)
+        return serialize or (lambda obj: obj), deserialize or (lambda data: data)
+
+
+
+class ConfigList(list):
+    """ A list that is a member of a config; any modification counts as a change of the owning config """
+
+
+    def __init__(self, owner: BaseConfig, iterable=(), name: str|None = None):
+        super().__init__(iterable)
+        self._owner = owner
+        self._is_index = name in owner._INDEX_FIELDS
+        for element in self:
+            owner._adopt(element)
+
+
+    def _changed(self, new_elements=()):
+        for element in new_elements:
+            self._owner._adopt(element)
+        self._owner._touch(self._is_index)
+
+
+    def __setitem__(self, index, value):
+        super().__setitem__(index, value)
+        self._changed(value if isinstance(index, slice) else [value])
+
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self._changed()
+
+    def __iadd__(self, other):
+        result = super().__iadd__(other)
+        self._changed(other)
+        return result
+
+    def __imul__(self, n):
+        result = super().__imul__(n)
+        self._changed()
+        return result
+
+    def append(self, value):
+        super().append(value)
+        self._changed([value])
+
+    def extend(self, iterable):
+        iterable = list(iterable)
+        super().extend(iterable)
+        self._changed(iterable)
+
+    def insert(self, index, value):
+        super().insert(index, value)
+        self._changed([value])
+
+    def pop(self, index=-1):
+        result = super().pop(index)
+        self._changed()
+        return result
+
+    def remove(self, value):
+        super().remove(value)
+        self._changed()
+
+    def clear(self):
+        super().clear()
+        self._changed()
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        self._changed()
+
+    def reverse(self):
+        super().reverse()
+        self._changed()
+
+    def __reduce__(self):
+        # copied as a plain list, which the owning config wraps again (see <BaseConfig.__setstate__()>)
+        return list, (list(self),)
+
+
+
+_UNSET = object()
+
+
+def _is_same_value(current: Any, value: Any) -> bool:
+    """ Whether assigning <value> to a member that holds <current> would leave the config unchanged """
+    if current is value:
+        return True
+    if current is _UNSET or not (type(current) is type(value) or isinstance(current, list) and isinstance(value, list)):
+        return False
+    try:
+        return bool(current == value)  # mutable configs compare by identity, so nested configs are never merged
+    except (TypeError, ValueError):
+        return False  # e.g. arrays, which do not compare to a single bool
+
+
+
+class BaseConfigMeta(type):
+    """ Turns the annotated class attributes of a config into slots; their defaults are kept in the schema of the class """
+
+
+    def __new__(mcs, name, bases, namespace, **kwargs):
+        if '__slots__' not in namespace:
+            annotations = namespace.get('__annotations__', {})
+            namespace['_field_defaults'] = {k: namespace.pop(k) for k in annotations.keys()}
+            namespace['__slots__'] = tuple(annotations.keys())
+        return super().__new__(mcs, name, bases, namespace, **kwargs)
+
+
+
+class BaseConfig(metaclass=BaseConfigMeta):
+
+    __slots__ = ('__dict__',)  # the members are slots of the derived classes, anything else goes into the dict
 
 
     class Volatile:
@@ -17,32 +179,145 @@ class BaseConfig:
             self.wrapped = wrapped
 
 
+    _frozen = False
+    _BOOKKEEPING_KEYS = frozenset(['_snapshot', '_parent', '_version', '_index_version'])
+    _INDEX_FIELDS = frozenset()  # members that configs are looked up by (see <index_version>)
+
+
+    @classmethod
+    def _get_fields(cls) -> tuple[ConfigField, ...]:
+        """ Returns the schema of the class, which is built once on first use (so that all annotations can be resolved) """
+        if '_fields' not in cls.__dict__:
+            hints = typing.get_type_hints(cls)
+            defaults = {}
+            for base in reversed(cls.__mro__):
+                defaults.update(base.__dict__.get('_field_defaults', {}))
+            cls._fields = tuple([ConfigField(name, hints[name], default) for name,default in defaults.items()])
+            cls._serialized_fields = tuple([field for field in cls._fields if not field.volatile])
+            cls._serialized_field_names = frozenset([field.name for field in cls._serialized_fields])
+            cls._field_names = frozenset([field.name for field in cls._fields])
+        return cls._fields
+
+
     def __new__(cls, *args, **kwargs):
         obj = object.__new__(cls)
-        obj._serialized_member_types = {}
-        obj._initial_member_values = {}
-        members = {k: cls.__dict__[k] for k in cls.__annotations__.keys()}
-        for name,typ in typing.get_type_hints(cls).items():
-            initial = members[name]
-            if isinstance(initial, BaseConfig.Volatile):
-                obj._initial_member_values[name] = initial.wrapped
+        obj.__dict__['_snapshot'] = None
+        obj.__dict__['_parent'] = None
+        obj.__dict__['_version'] = 0
+        obj.__dict__['_index_version'] = 0
+        for field in cls._get_fields():
+            if field.nested:
+                obj._set_member(field.name, field.make_default())
             else:
-                obj._initial_member_values[name] = initial
-                obj._serialized_member_types[name] = typ
+                object.__setattr__(obj, field.name, field.default)
         return obj
 
 
     def __init__(self, format_version_str: str = None):
-        for name,value in self._initial_member_values.items():
-            self.__dict__[name] = value
         self._format_version_str = format_version_str
-    
+
+
+    def __setattr__(self, name, value):
+        if self._frozen:
+            raise AttributeError(f'Cannot set "{name}"; {type(self).__name__} is a read-only snapshot')
+        if name in self._field_names:
+            if _is_same_value(getattr(self, name, _UNSET), value):
+                return  # re-assigning the current value is not a change, so keep the version
+            self._set_member(name, value)
+            self._touch(name in self._INDEX_FIELDS)
+        else:
+            object.__setattr__(self, name, value)
+
+
+    def _set_member(self, name: str, value: Any):
+        object.__setattr__(self, name, self._adopt(value, name))
+
+
+    def _adopt(self, value: Any, name: str|None = None) -> Any:
+        """ Makes this config the parent of a nested config, or the owner of a list, so that their changes are propagated """
+        if isinstance(value, BaseConfig):
+            if not value._frozen:
+                value.__dict__['_parent'] = self
+        elif isinstance(value, list) and not (isinstance(value, ConfigList) and value._owner is self):
+            value = ConfigList(self, value, name)
+        return value
+
+
+    def _touch(self, index_changed: bool = False):
+        obj = self
+        while obj is not None:
+            obj.__dict__['_version'] += 1
+            if index_changed:
+                obj.__dict__['_index_version'] += 1
+            obj = obj.__dict__['_parent']
+
+
+    def __getstate__(self):
+        # the bookkeeping (e.g. the cached snapshot) refers to other objects, and is rebuilt instead of being copied
+        extras = {k: v for k,v in self.__dict__.items() if k not in self._BOOKKEEPING_KEYS}
+        members = {field.name: getattr(self, field.name) for field in self._get_fields()}
+        return extras, members
+
+
+    def __copy__(self):
+        # a shallow copy shares the nested configs and lists, which therefore stay attached to this config
+        obj = object.__new__(type(self))
+        extras, members = self.__getstate__()
+        obj.__dict__.update(extras)
+        obj.__dict__.update(_snapshot=None, _parent=None, _version=self.__dict__['_version'], _index_version=self.__dict__['_index_version'])
+        for name,value in members.items():
+            object.__setattr__(obj, name, value)
+        return obj
+
+
+    def __setstate__(self, state):
+        extras, members = state
+        self.__dict__.update(extras)
+        for name,value in members.items():
+            if self._frozen:
+                object.__setattr__(self, name, value)
+            else:
+                self._set_member(name, value)
+        if self._frozen:
+            self.__dict__['_hash'] = self._calc_hash()  # string hashes differ between processes
+
+
+    @property
+    def version(self) -> int:
+        """ A counter that is incremented whenever a member of this config (or of any nested config) has changed """
+        return self.__dict__['_version']
+
+
+    @property
+    def index_version(self) -> int:
+        """ Like <version>, but only incremented when a member in <_INDEX_FIELDS> (of this config or of any nested config) has changed.
+
+        This allows to keep e.g. a lookup table by name, which is not affected by changes to the other members.
+        """
+        return self.__dict__['_index_version']
+
 
     def __hash__(self):
+        if self._frozen:
+            return self.__dict__['_hash']
+        return self._calc_hash()
+
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if not (self._frozen and isinstance(other, BaseConfig) and other._frozen and type(self) is type(other)):
+            return NotImplemented  # mutable configs only compare by identity
+        if hash(self) != hash(other):
+            return False
+        return all(getattr(self, field.name) == getattr(other, field.name) for field in self._fields)
+
+
+    def _calc_hash(self):
         all_hashes = []
-        for k in self._initial_member_values.keys():
-            item = self.__dict__[k]
-            if isinstance(item, list):
+        for field in self._fields:
+            item = getattr(self, field.name)
+            if isinstance(item, (list,tuple)):
                 all_hashes.append(hash(tuple([hash(subitem) for subitem in item])))
             elif isinstance(item, (str,int,float,complex,bool,enum.Enum,BaseConfig)):
                 all_hashes.append(hash(item))
@@ -55,14 +330,126 @@ class BaseConfig:
         return hash(tuple(all_hashes))
 
 
+    def copy(self) -> Self:
+        """ Returns a mutable deep copy of the members of this config (but not of any other attributes) """
+        obj = type(self)()
+        for field in self._fields:
+            value = getattr(self, field.name)
+            if isinstance(value, BaseConfig):
+                value = value.copy()
+            elif isinstance(value, (list,tuple)):
+                value = [element.copy() if isinstance(element, BaseConfig) else element for element in value]
+            obj._set_member(field.name, value)
+        return obj
+
+
+    @property
+    def frozen(self) -> bool:
+        return self._frozen
+
+
+    def snapshot(self) -> Self:
+        """ Returns a read-only, hashable copy of this config.
+
+        Lists are turned into tuples, and nested configs into snapshots as well. The snapshot is cached, and
+        only re-built where something has changed in the meantime, so unchanged sub-configs are shared between
+        successive snapshots (which means that <snap1.plot is snap2.plot> if the plot-config did not change).
+        Any non-config attributes (e.g. data frames) are shallow-copied into the snapshot.
+        If the version is unchanged, the previous snapshot is returned without looking at the members.
+        """
+
+        if self._frozen:
+            return self
+
+        previous = self.__dict__['_snapshot']
+        extras = {k: v for k,v in self.__dict__.items() if k not in self._BOOKKEEPING_KEYS}
+        if previous is not None and previous.__dict__['_version'] == self.__dict__['_version']:
+            if all(previous.__dict__[k] is v for k,v in extras.items()):
+                return previous
+        
+        def freeze(value):
+            if isinstance(value, BaseConfig):
+                return value.snapshot()
+            elif isinstance(value, list):
+                return tuple([freeze(element) for element in value])
+            return value
+        
+        members = {field.name: freeze(getattr(self, field.name)) for field in self._fields}
+
+        if previous is not None:
+            unchanged = True
+            for k,v in members.items():
+                previous_value = getattr(previous, k)
+                if previous_value is v or previous_value == v:
+                    members[k] = previous_value  # share the unchanged part
+                else:
+                    unchanged = False
+            unchanged = unchanged and all(previous.__dict__[k] is v for k,v in extras.items())
+            if unchanged:
+                previous.__dict__['_version'] = self.__dict__['_version']
+                previous.__dict__['_index_version'] = self.__dict__['_index_version']
+                return previous
+        
+        snap = object.__new__(type(self))
+        snap.__dict__.update(extras)
+        for k,v in members.items():
+            object.__setattr__(snap, k, v)
+        snap.__dict__['_snapshot'] = None
+        snap.__dict__['_parent'] = None
+        snap.__dict__['_version'] = self.__dict__['_version']
+        snap.__dict__['_index_version'] = self.__dict__['_index_version']
+        snap.__dict__['_hash'] = snap._calc_hash()
+        snap.__dict__['_frozen'] = True
+        self.__dict__['_snapshot'] = snap
+        return snap
+
+
+    def with_attributes_of(self, config: Self) -> Self:
+        """ Returns a copy of this snapshot, with the same members, but with the non-config attributes of <config>.
+
+        This is used to render from a snapshot that was taken earlier, but with data that was loaded since then.
+        """
+        assert self._frozen, 'Only snapshots can be updated'
+        extras = {k: v for k,v in config.__dict__.items() if k not in self._BOOKKEEPING_KEYS}
+        if all(k in self.__dict__ and self.__dict__[k] is v for k,v in extras.items()):
+            return self
+        snap = object.__new__(type(self))
+        snap.__dict__.update(self.__dict__)
+        snap.__dict__.update(extras)
+        for field in self._fields:
+            object.__setattr__(snap, field.name, getattr(self, field.name))
+        return snap
+
+
+    def with_members(self, **members) -> Self:
+        """ Returns a copy of this snapshot, with the given members replaced by (read-only) values """
+        assert self._frozen, 'Only snapshots can be updated'
+        snap = object.__new__(type(self))
+        snap.__dict__.update({k: v for k,v in self.__dict__.items() if k not in self._BOOKKEEPING_KEYS})
+        snap.__dict__.update(_snapshot=None, _parent=None, _version=self.__dict__['_version'], _index_version=self.__dict__['_index_version'])
+        for field in self._fields:
+            object.__setattr__(snap, field.name, members.get(field.name, getattr(self, field.name)))
+        snap.__dict__['_hash'] = snap._calc_hash()
+        return snap
+
+
     def save(self, path_or_fp):
+        """ Saves as JSON; a file is written atomically (via a temporary file), so it is never left truncated """
         data = self._serialize()
         if hasattr(path_or_fp, 'write') and callable(path_or_fp.write):
             json.dump(data, path_or_fp, indent=4)
         else:
-            with open(path_or_fp, 'w') as fp:
-                json.dump(data, fp, indent=4)
-            
+            path = os.path.abspath(path_or_fp)
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.' + os.path.basename(path), suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as fp:
+                    json.dump(data, fp, indent=4)
+                os.chmod(temp_path, stat.S_IMODE(os.stat(path).st_mode) if os.path.exists(path) else 0o644)
+                os.replace(temp_path, path)
+            except BaseException:
+                os.remove(temp_path)
+                raise
+
 
 
     @classmethod
@@ -81,18 +468,8 @@ class BaseConfig:
         if self._format_version_str:
             data['file_format'] = self._format_version_str
 
-        def serialize(obj, typ):
-            if issubclass(typ, BaseConfig):
-                return obj._serialize()
-            else:  # plain data
-                return obj
-
-        for name in self._serialized_member_types.keys():
-            if typing.get_origin(self._serialized_member_types[name]) is list:
-                serialized = [serialize(element,typing.get_args(self._serialized_member_types[name])[0]) for element in self.__dict__[name]]
-            else:
-                serialized = serialize(self.__dict__[name],self._serialized_member_types[name])
-            data[name] = serialized
+        for field in self._serialized_fields:
+            data[field.name] = field.serialize(getattr(self, field.name))
         
         return data
 
@@ -109,37 +486,22 @@ class BaseConfig:
             else:
                 logging.warning(f'File format not specified in loaded file (expected "{obj._format_version_str}"), ignoring')
 
-        expected_keys = set(obj._serialized_member_types.keys())
-        found_keys = set([k for k in data.keys() if k!='file_format'])
+        missing_keys = []
+        for field in obj._serialized_fields:
+            if field.name not in data:
+                missing_keys.append(field.name)
+                continue
+            deserialized = field.deserialize(data[field.name])
+            if deserialized is not None:
+                if field.nested:
+                    obj._set_member(field.name, deserialized)
+                else:
+                    object.__setattr__(obj, field.name, deserialized)
 
-        missing_keys = expected_keys - found_keys
-        excess_keys = found_keys - expected_keys
-        used_keys = found_keys & expected_keys
         if len(missing_keys) > 0:
-            logging.warning(f'The following settings were not found in the loaded file: {missing_keys}; ignoring')
-        if len(excess_keys) > 0:
+            logging.warning(f'The following settings were not found in the loaded file: {set(missing_keys)}; ignoring')
+        if len(data) - ('file_format' in data) > len(obj._serialized_fields) - len(missing_keys):
+            excess_keys = set([k for k in data.keys() if k != 'file_format']) - obj._serialized_field_names
             logging.warning(f'The following settings were found in the loaded file, but are unknown: {excess_keys}; ignoring')
-
-        def deserialize(data, typ):
-            if issubclass(typ, BaseConfig):
-                return typ._deserialize(data)
-            else:  # plain data
-                if typ is typing.Any:
-                    return data
-                try:
-                    return typ(data)
-                except Exception as ex:
-                    logging.warning(f'Cannot cast >{data}> to <{typ}> for config "{name}"; ignoring')
-                    return None
-
-        for name in used_keys:
-
-            if typing.get_origin(obj._serialized_member_types[name]) is list:
-                deserialized = [deserialize(element,typing.get_args(obj._serialized_member_types[name])[0]) for element in data[name]]
-            else:
-                deserialized = deserialize(data[name],obj._serialized_member_types[name])
-            
-            if deserialized is not None:
-                obj.__dict__[name] = deserialized
     
         return obj
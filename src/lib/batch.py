@@ -0,0 +1,92 @@
+from .config import Config
+from .pipeline import Pipeline, Stage
+from .parse_cache import ParseCache
+from . import typed_json
+
+import os
+import re
+import glob
+import time
+import pathlib
+import logging
+import concurrent.futures
+import plotly.io
+
+
+
+FORMATS = ['html', 'json', 'parquet']
+
+
+
+def _select_files(config: Config, input_spec: str):
+    """ A directory replaces <glob_dir> (keeping the pattern and expressions of the config); anything else is a glob pattern of files """
+    if os.path.isdir(input_spec):
+        config.input.glob_dir = input_spec
+        config.input.files = [str(path) for path in config.input.find_files()]
+    else:
+        config.input.files = sorted(glob.glob(input_spec, recursive=True))
+    if len(config.input.files) == 0:
+        raise RuntimeError(f'No files found for <{input_spec}>')
+
+
+def _get_output_name(index: int, input_spec: str) -> str:
+    # the last path component without wildcards, e.g. the directory of a glob pattern
+    fixed_parts = [part for part in pathlib.Path(input_spec).parts if not re.search(r'[*?\[]', part)]
+    name = pathlib.Path(*fixed_parts).name if len(fixed_parts) > 0 else ''
+    name = name or 'input'
+    return f'{index:03d}_' + re.sub(r'[^\w.-]+', '_', name)
+
+
+def run_job(config_path: str, input_spec: str, index: int, output_dir: str, formats: list[str], parse_cache_dir: str|None) -> dict:
+    """ Applies the config to one set of files, and writes the outputs; returns a report entry with the timings of each step """
+
+    report = dict(input=input_spec, files=0, rows=0, status='ok', times={})
+    try:
+        t0 = time.perf_counter()
+        config = Config().load(config_path)
+        _select_files(config, input_spec)
+        report['files'] = len(config.input.files)
+
+        pipeline = Pipeline(config, parse_cache=ParseCache(parse_cache_dir) if parse_cache_dir else None)
+        for stage in Stage:
+            t = time.perf_counter()
+            pipeline.run(until=stage)
+            report['times'][stage.name.lower()] = time.perf_counter() - t
+        report['rows'] = len(config.df)
+
+        t = time.perf_counter()
+        base_path = os.path.join(output_dir, _get_output_name(index, input_spec))
+        os.makedirs(output_dir, exist_ok=True)
+        if 'parquet' in formats:
+            config.df.write_parquet(base_path + '.parquet')
+        if pipeline.figure is not None:
+            if 'html' in formats:
+                plotly.io.write_html(pipeline.figure, base_path + '.html', include_plotlyjs=True, validate=False)
+            if 'json' in formats:
+                with open(base_path + '.json', 'w') as fp:
+                    fp.write(typed_json.to_json(pipeline.figure, strict=True))
+        report['times']['write'] = time.perf_counter() - t
+        report['times']['total'] = time.perf_counter() - t0
+
+    except Exception as ex:
+        logging.error(f'Processing <{input_spec}> failed ({ex})')
+        report['status'] = f'failed ({ex})'
+
+    return report
+
+
+def run_batch(config_path: str, input_specs: list[str], output_dir: str, formats: list[str], *, jobs: int|None = None, parse_cache_dir: str|None = None) -> list[dict]:
+    """ Runs <run_job()> for each input in a pool of processes; the reports are returned in the order of the inputs """
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(run_job, config_path, input_spec, index, output_dir, formats, parse_cache_dir) for index,input_spec in enumerate(input_specs)]
+        return [future.result() for future in futures]
+
+
+def format_report(reports: list[dict]) -> str:
+    steps = ['load', 'filter', 'plot', 'write', 'total']
+    lines = [f'{"input":<40} {"files":>6} {"rows":>10} ' + ' '.join([f'{step:>8}' for step in steps]) + '  status']
+    for report in reports:
+        times = ' '.join([f'{report["times"][step]:>7.3f}s' if step in report['times'] else f'{"-":>8}' for step in steps])
+        lines.append(f'{report["input"][-40:]:<40} {report["files"]:>6} {report["rows"]:>10} {times}  {report["status"]}')
+    return '\n'.join(lines)
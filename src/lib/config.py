@@ -1,13 +1,16 @@
 from __future__ import annotations
 
 from .base_config import BaseConfig
+from . import autosave
 
 import enum
 import polars
 import pathlib
 import re
 import os
-from typing import Any, Callable, Self
+import json
+import hashlib
+from typing import Any, Callable, Hashable, Self
 
 
 
@@ -43,6 +46,7 @@ class PlotType(enum.StrEnum):
     StatMatrix = 'stat-matrix'
     Heatmap = 'heatmap'
     Scatter3D = 'scatter-3d'
+    Raster = 'raster'
 
 
 
@@ -67,6 +71,50 @@ class TraceStyle(enum.StrEnum):
 
 
 
+class HeatmapAggregation(enum.StrEnum):
+    Count = 'count'
+    Mean = 'mean'
+    Min = 'min'
+    Max = 'max'
+
+
+
+class Aggregation(enum.StrEnum):
+    Off = 'off'
+    Mean = 'mean'
+    Median = 'median'
+
+
+
+class AggregationBand(enum.StrEnum):
+    Off = 'off'
+    Std = 'std'
+    MinMax = 'min-max'
+    Percentile = 'percentile'
+
+
+
+class DownsampleMethod(enum.StrEnum):
+    Off = 'off'
+    MinMax = 'min-max'
+    LTTB = 'lttb'
+
+
+
+class WebGlMode(enum.StrEnum):
+    Auto = 'auto'
+    On = 'on'
+    Off = 'off'
+
+
+
+class TraceBatching(enum.StrEnum):
+    Auto = 'auto'
+    On = 'on'
+    Off = 'off'
+
+
+
 class ConfigInput(BaseConfig):
     glob_dir: str = None
     glob_pattern: str = ''
@@ -76,6 +124,24 @@ class ConfigInput(BaseConfig):
     csv_separator: str = ','
 
 
+    def find_files(self, apply_regex: bool = True) -> list[pathlib.Path]:
+        """ Returns the files in <glob_dir> that match <glob_pattern> (and optionally the include/exclude expressions) """
+        if not self.glob_dir:
+            raise RuntimeError(f'No directory defined')
+        
+        rex_include = re.compile(self.glob_regex_include) if self.glob_regex_include and apply_regex else None
+        rex_exclude = re.compile(self.glob_regex_exclude) if self.glob_regex_exclude and apply_regex else None
+        
+        files = []
+        for path in sorted(pathlib.Path(self.glob_dir).glob(self.glob_pattern)):
+            if rex_include and not rex_include.match(path.name):
+                continue
+            if rex_exclude and rex_exclude.match(path.name):
+                continue
+            files.append(path)
+        return files
+
+
 
 class ConfigPlot(BaseConfig):
     type: PlotType = PlotType.Scatter
@@ -83,6 +149,21 @@ class ConfigPlot(BaseConfig):
     matrix_lower_triangle_type: MatrixTrianglePlotType = MatrixTrianglePlotType.Off
     matrix_upper_triangle_type: MatrixTrianglePlotType = MatrixTrianglePlotType.Scatter
     scatter_lines: bool = True
+    aggregation: Aggregation = Aggregation.Off
+    aggregation_band: AggregationBand = AggregationBand.Std
+    aggregation_percentile: float = 10.0
+    heatmap_aggregation: HeatmapAggregation = HeatmapAggregation.Mean
+    heatmap_max_bins: int = 200
+    raster_width: int = 800
+    raster_height: int = 600
+    downsample_method: DownsampleMethod = DownsampleMethod.LTTB
+    max_points_per_trace: int = 5_000
+    matrix_max_points: int = 2_000
+    matrix_stratified_sampling: bool = False  # by the color column, or else by file
+    webgl: WebGlMode = WebGlMode.Auto
+    webgl_threshold: int = 20_000
+    trace_batching: TraceBatching = TraceBatching.Auto
+    batching_threshold: int = 200
     x_title: str = ''
     y_title: str = ''
     z_title: str = ''
@@ -156,6 +237,9 @@ class ConfigFilter(BaseConfig):
 
 
 class ConfigColumnSetup(BaseConfig):
+
+    _INDEX_FIELDS = frozenset(['col'])
+
     col: str = ''
     filter: ConfigFilter = ConfigFilter()
     sort: Sort = Sort.Off
@@ -169,6 +253,9 @@ class ConfigColumnSetup(BaseConfig):
 
 
 class ColumnSwitch(BaseConfig):
+
+    _INDEX_FIELDS = frozenset(['col', 'active'])
+
     col: str = ''
     active: bool = True
 
@@ -183,7 +270,20 @@ class ColumnRole(enum.Enum):
 
 
 
+class ConfigSection(enum.Enum):
+    Input = enum.auto()
+    Filters = enum.auto()
+    Sorting = enum.auto()
+    Roles = enum.auto()
+    Styles = enum.auto()
+    Plot = enum.auto()
+
+
+
 class Config(BaseConfig):
+
+    _BOOKKEEPING_KEYS = BaseConfig._BOOKKEEPING_KEYS | {'_lookups'}
+    _INDEX_FIELDS = frozenset(['col_setups', 'cols_group', 'cols_x', 'cols_y', 'cols_z'])
     
     input: ConfigInput = ConfigInput()
     col_setups: list[ConfigColumnSetup] = []
@@ -200,6 +300,12 @@ class Config(BaseConfig):
         self._df: polars.DataFrame|None = None
         self._all_columns: list[str] = []
         self._column_values: dict[str,list[str]] = {}
+        self._raw_df_version: int = 0
+        self._df_version: int = 0
+        self._df_cache: dict[Hashable,Any] = {}
+        self._section_states: dict[ConfigSection,Any] = {}
+        self._section_versions: dict[ConfigSection,int] = {}
+        self.raw_df_source: dict|None = None  # the input that <raw_df> was loaded from, see <get_input_state()>
         self.filename: str = ''
 
     @property
@@ -212,8 +318,14 @@ class Config(BaseConfig):
         self._raw_df = value
         self._all_columns = self.raw_df.columns
         self._column_values = {}
+        self._raw_df_version += 1
+        self.raw_df_source = None
         self._df = None
-        self._ensure_setups_exist()
+        self._df_cache = {}
+
+    @property
+    def raw_df_version(self) -> int:
+        return self._raw_df_version
 
     @property
     def df(self) -> polars.DataFrame:
@@ -223,27 +335,102 @@ class Config(BaseConfig):
     @df.setter
     def df(self, value: polars.DataFrame):
         self._df = value
+        self._df_version += 1
+        self._df_cache = {}
+
+    @property
+    def df_version(self) -> int:
+        return self._df_version
+
+    def get_df_cached(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """ Returns a value derived from <df>, which is only computed once for each version of <df> """
+        if key not in self._df_cache:
+            self._df_cache[key] = compute()
+        return self._df_cache[key]
 
     @property
     def all_columns(self) -> list[str]:
         assert self._all_columns is not None, 'Config not initialized'
         return self._all_columns
 
-    def _ensure_setups_exist(self):
-        all_cols = set(self._all_columns)
-        available_cols = set([setup.col for setup in self.col_setups])
-        missing_cols = all_cols - available_cols
-        for col in missing_cols:
-            setup = ConfigColumnSetup()
-            setup.col = col
+    def ensure_setups_exist(self):
+        """ Adds a default setup for each column of <raw_df> that has none.
+
+        This changes the config, so (unlike setting <raw_df>) it is not done by the pipeline, which may run in
+        another thread; see <with_missing_setups()> for snapshots.
+        """
+        for setup in self._make_missing_setups():
             self.col_setups.append(setup)
 
+    def with_missing_setups(self) -> Config:
+        """ Returns a copy of this snapshot with a default setup for each column that has none (see <ensure_setups_exist()>) """
+        missing = self._make_missing_setups()
+        if len(missing) == 0:
+            return self
+        return self.with_members(col_setups=self.col_setups + tuple([setup.snapshot() for setup in missing]))
+
+    def _make_missing_setups(self) -> list[ConfigColumnSetup]:
+        available_cols = set([setup.col for setup in self.col_setups])
+        missing = []
+        for col in self._all_columns:
+            if col not in available_cols:
+                setup = ConfigColumnSetup()
+                setup.col = col
+                missing.append(setup)
+        return missing
+
+
+    def section_version(self, section: ConfigSection, snap: Config|None = None) -> int:
+        """ Returns a counter that is incremented whenever the given section of the config has changed since the last call """
+        state = self._get_section_state(snap or self.snapshot(), section)
+        if section not in self._section_states or self._section_states[section] != state:
+            self._section_states[section] = state
+            self._section_versions[section] = self._section_versions.get(section, 0) + 1
+        return self._section_versions[section]
+
+    @staticmethod
+    def _get_section_state(snap: Config, section: ConfigSection) -> Any:
+        match section:
+            case ConfigSection.Input:
+                return (snap.input.files, snap.input.csv_separator)
+            case ConfigSection.Filters:
+                return tuple([(setup.col, setup.filter) for setup in snap.col_setups if setup.filter.mode != FilterMode.Off])
+            case ConfigSection.Sorting:
+                sort_by_col = {setup.col: setup.sort for setup in snap.col_setups if setup.sort != Sort.Off}
+                return tuple([(switch.col, sort_by_col[switch.col]) for role in [ColumnRole.Y, ColumnRole.X, ColumnRole.Group] for switch in snap.get_switches(role) if switch.col in sort_by_col])
+            case ConfigSection.Roles:
+                return (snap.cols_group, snap.cols_x, snap.cols_y, snap.cols_z)
+            case ConfigSection.Styles:
+                return tuple([(setup.col, setup.as_color, setup.as_size, setup.as_style) for setup in snap.col_setups if setup.as_color or setup.as_size or setup.as_style])
+            case ConfigSection.Plot:
+                return snap.plot
+        raise ValueError()
+
+    def _get_lookups(self) -> tuple[int, dict[str,ConfigColumnSetup], dict[str,frozenset[ColumnRole]]]:
+        """ Returns the setup and the active roles of each column; re-built whenever the setups or switches have changed """
+        lookups = self.__dict__.get('_lookups')
+        if lookups is None or lookups[0] != self.index_version:
+            setups = {}
+            for col_setup in self.col_setups:
+                setups.setdefault(col_setup.col, col_setup)
+            roles = {}
+            for role in [ColumnRole.Group, ColumnRole.X, ColumnRole.Y, ColumnRole.Z]:
+                for switch in self.get_switches(role):
+                    if switch.active:
+                        roles.setdefault(switch.col, set()).add(role)
+            lookups = (self.index_version, setups, {col: frozenset(col_roles) for col,col_roles in roles.items()})
+            self.__dict__['_lookups'] = lookups  # also for snapshots, which are otherwise read-only
+        return lookups
 
     def find_setup(self, col: str) -> ConfigColumnSetup:
-        for col_setup in self.col_setups:
-            if col_setup.col == col:
-                return col_setup
-        raise RuntimeError(f'No setup for column "{col}" found.')
+        setup = self._get_lookups()[1].get(col)
+        if setup is None:
+            raise RuntimeError(f'No setup for column "{col}" found.')
+        return setup
+
+    def get_active_roles(self, col: str) -> frozenset[ColumnRole]:
+        """ Returns the roles in which the column is used by an active switch """
+        return self._get_lookups()[2].get(col, frozenset())
 
     def get_switches(self, role: ColumnRole) -> list[ColumnSwitch]:
         match role:
@@ -274,9 +461,35 @@ class Config(BaseConfig):
             self._column_values[col] = list(sorted(self.raw_df.get_column(col).unique()))
         return self._column_values[col]
 
+    def get_file_states(self) -> list[list]:
+        """ Returns [path, size, modification time] of each input file (with None for missing files) """
+        def file_state(path: str):
+            try:
+                stat = os.stat(path)
+                return [path, stat.st_size, stat.st_mtime_ns]
+            except OSError:
+                return [path, None, None]
+        return [file_state(path) for path in self.input.files]
+
+    def get_input_state(self) -> dict:
+        """ The state of the input files, and how they are parsed """
+        return dict(files=self.get_file_states(), csv_separator=self.input.csv_separator)
+
+    def fingerprint(self) -> str:
+        """ A stable hash of the config and of the state of the input files (path, size, modification time).
+        
+        Unlike the version counters, it is the same across sessions, so it can be used to cache results on disk.
+        The file states are those from when the data was loaded, so a file that changes afterwards does not
+        change the fingerprint of results that were computed from the data in memory.
+        """
+        source = self.raw_df_source if self.raw_df_source is not None else self.get_input_state()
+        data = dict(config=self._serialize(), files=source['files'])
+        return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
     def autosave(self):
+        """ Saves to "~<filename>" in the background, shortly after the last change (see <autosave.Autosaver>) """
         if not self.filename:
                 return
         path = pathlib.Path(self.filename).absolute()
         autosave_path = os.path.join(path.parent, '~' + path.name)
-        self.save(autosave_path)
+        autosave.get_autosaver().request(autosave_path, self)
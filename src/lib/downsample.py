@@ -0,0 +1,118 @@
+import numpy as np
+
+
+
+def as_float(values: np.ndarray) -> np.ndarray:
+    """ Converts numeric, boolean or date/time data to float; anything else (e.g. strings) is replaced by its category index """
+    if np.issubdtype(values.dtype, np.datetime64) or np.issubdtype(values.dtype, np.timedelta64):
+        return values.view(np.int64).astype(np.float64)
+    if np.issubdtype(values.dtype, np.number) or np.issubdtype(values.dtype, np.bool_):
+        return values.astype(np.float64, copy=False)
+    _, codes = np.unique(values.astype(str), return_inverse=True)
+    return codes.astype(np.float64)
+
+
+def _get_bucket_starts(n: int, n_buckets: int) -> np.ndarray:
+    """ Splits <n> values into <n_buckets> buckets whose sizes differ by at most one; returns the <n_buckets>+1 boundaries """
+    return np.linspace(0, n, n_buckets + 1).astype(np.int64)
+
+
+def _first_index_of_reduced(values: np.ndarray, starts: np.ndarray, reduce: np.ufunc) -> np.ndarray:
+    """ Returns the index of the first value in each bucket that equals its reduction (e.g. the minimum, for <np.minimum>) """
+    sizes = np.diff(starts)
+    reduced = reduce.reduceat(values, starts[:-1])
+    matches = np.flatnonzero(values == np.repeat(reduced, sizes))
+    _, first = np.unique(np.repeat(np.arange(len(sizes)), sizes)[matches], return_index=True)
+    return matches[first]
+
+
+def minmax_indices(y: np.ndarray, n_max: int) -> np.ndarray:
+    """ Splits the data into buckets, and keeps the minimum and maximum of each bucket (plus the first and last point) """
+    n = len(y)
+    if n <= n_max:
+        return np.arange(n)
+
+    y = as_float(y)
+    n_buckets = max(1, (n_max - 2) // 2)
+    starts = _get_bucket_starts(n, n_buckets)
+    i_min = _first_index_of_reduced(np.where(np.isnan(y), np.inf, y), starts, np.minimum)
+    i_max = _first_index_of_reduced(np.where(np.isnan(y), -np.inf, y), starts, np.maximum)
+    return np.unique(np.concatenate([[0, n-1], i_min, i_max]))
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_max: int) -> np.ndarray:
+    """ Largest-Triangle-Three-Buckets downsampling.
+
+    From each bucket, the point that spans the largest triangle with the neighboring buckets is kept. To be able
+    to process all buckets at once, the previous bucket is represented by its average (like the next one), instead
+    of by the point that was selected from it.
+    """
+
+    n = len(y)
+    if n <= n_max:
+        return np.arange(n)
+    if n_max < 3:
+        return minmax_indices(y, n_max)
+
+    x, y = as_float(x), as_float(y)
+    n_buckets = n_max - 2
+    x_inner, y_inner = x[1:-1], y[1:-1]
+    starts = _get_bucket_starts(len(x_inner), n_buckets)
+    sizes = np.diff(starts)
+
+    def bucket_means(values: np.ndarray) -> np.ndarray:
+        valid = ~np.isnan(values)
+        return np.add.reduceat(np.where(valid, values, 0), starts[:-1]) / np.add.reduceat(valid, starts[:-1])
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        x_avg, y_avg = bucket_means(x_inner), bucket_means(y_inner)
+        x_prev, y_prev = np.concatenate([[x[0]], x_avg[:-1]]), np.concatenate([[y[0]], y_avg[:-1]])
+        x_next, y_next = np.concatenate([x_avg[1:], [x[-1]]]), np.concatenate([y_avg[1:], [y[-1]]])
+        # the triangle of each point with the neighboring buckets, with the bucket parameters repeated per point
+        area = np.abs(
+            np.repeat(x_prev - x_next, sizes) * (y_inner - np.repeat(y_prev, sizes)) -
+            (np.repeat(x_prev, sizes) - x_inner) * np.repeat(y_next - y_prev, sizes)
+        )
+    area = np.where(np.isfinite(area), area, -1)
+    selected = 1 + _first_index_of_reduced(area, starts, np.maximum)
+    return np.unique(np.concatenate([[0], selected, [n-1]]))
+
+
+def density_indices(x: np.ndarray, y: np.ndarray, n_max: int, seed: int = 0) -> np.ndarray:
+    """ Samples scattered points on a 2D grid, so that sparse regions (e.g. outliers) are kept, and dense regions are thinned out """
+    n = len(y)
+    if n <= n_max:
+        return np.arange(n)
+
+    def to_cell(values: np.ndarray, n_cells: int) -> np.ndarray:
+        values = as_float(values)
+        lo, hi = np.nanmin(values), np.nanmax(values)
+        if not (hi > lo):
+            return np.zeros(len(values), dtype=np.int64)
+        cell = np.floor((values - lo) / (hi - lo) * (n_cells - 1))
+        return np.nan_to_num(cell, nan=0).astype(np.int64)
+
+    n_cells_per_axis = max(1, int(np.ceil(np.sqrt(n_max))))
+    cell = to_cell(x, n_cells_per_axis) * n_cells_per_axis + to_cell(y, n_cells_per_axis)
+
+    points_per_cell = np.bincount(cell)
+
+    # find the largest per-cell quota that keeps the total within budget
+    lo, hi = 0, int(points_per_cell.max())
+    while lo < hi:
+        quota = (lo + hi + 1) // 2
+        if np.sum(np.minimum(points_per_cell, quota)) <= n_max:
+            lo = quota
+        else:
+            hi = quota - 1
+    rng = np.random.default_rng(seed)
+    quota_per_cell = np.minimum(points_per_cell, lo)
+    # spend the rest of the budget on one more point in some of the dense cells (fewer than there are, as <lo> is the largest quota)
+    dense_cells = np.flatnonzero(points_per_cell > lo)
+    quota_per_cell[rng.permutation(dense_cells)[:n_max - np.sum(quota_per_cell)]] += 1
+
+    # keep every point of sparse cells, and a random (but deterministic between renders) selection from dense cells
+    order = np.lexsort((rng.random(n), cell))
+    cell_starts = np.cumsum(points_per_cell) - points_per_cell
+    rank_in_cell = np.arange(n) - cell_starts[cell[order]]
+    return np.sort(order[rank_in_cell < quota_per_cell[cell[order]]])
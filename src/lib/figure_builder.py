@@ -0,0 +1,111 @@
+import os
+import copy
+import logging
+import plotly.io
+import plotly.graph_objects as go
+from typing import Any
+
+
+
+class FigureBuilder:
+    """ Assembles a Plotly figure as plain dicts, without running Plotly's (slow) property validators.
+
+    The result of <build()> is a figure-dict like <go.Figure.to_plotly_json()> would return. For debugging,
+    set <FigureBuilder.validate> (or the environment variable CDV_VALIDATE_FIGURES) to route every figure
+    through <go.Figure>, so that invalid properties raise an error.
+    """
+
+
+    validate: bool = os.environ.get('CDV_VALIDATE_FIGURES', '') not in ['', '0']
+
+
+    _template: dict|None = None
+
+
+    def __init__(self, rows: int = 1, cols: int = 1):
+        self._rows, self._cols = rows, cols
+        self._data: list[dict] = []
+        self._layout: dict = dict(template=FigureBuilder._get_template())
+        if rows > 1 or cols > 1:
+            self._make_grid()
+
+
+    @staticmethod
+    def _get_template() -> dict:
+        """ The default template, validated only once """
+        if FigureBuilder._template is None:
+            FigureBuilder._template = plotly.io.templates[plotly.io.templates.default].to_plotly_json()
+        return FigureBuilder._template
+
+
+    def _make_grid(self):
+        # same default spacing as <plotly.subplots.make_subplots()>
+        h_spacing, v_spacing = 0.2 / self._cols, 0.3 / self._rows
+        width = (1 - h_spacing*(self._cols-1)) / self._cols
+        height = (1 - v_spacing*(self._rows-1)) / self._rows
+        for row in range(1, self._rows+1):
+            for col in range(1, self._cols+1):
+                x_name, y_name = self._get_axis_names(row, col)
+                x0 = (col-1) * (width + h_spacing)
+                y1 = 1 - (row-1) * (height + v_spacing)
+                self._layout[x_name.replace('x', 'xaxis')] = dict(anchor=y_name, domain=[x0, min(1,x0+width)])
+                self._layout[y_name.replace('y', 'yaxis')] = dict(anchor=x_name, domain=[max(0,y1-height), y1])
+
+
+    def _get_axis_names(self, row: int|None, col: int|None) -> tuple[str,str]:
+        if row is None or col is None:
+            return 'x', 'y'
+        index = (row-1) * self._cols + col
+        if index == 1:
+            return 'x', 'y'
+        return f'x{index}', f'y{index}'
+
+
+    @staticmethod
+    def _merge(target: dict, props: dict):
+        for key,value in props.items():
+            if isinstance(value, dict) and isinstance(target.get(key), dict):
+                FigureBuilder._merge(target[key], value)
+            else:
+                target[key] = value
+
+
+    def add_trace(self, type: str, *, row: int|None = None, col: int|None = None, **props) -> int:
+        trace = dict(type=type, **props)
+        if row is not None and col is not None:
+            trace['xaxis'], trace['yaxis'] = self._get_axis_names(row, col)
+        self._data.append(trace)
+        return len(self._data) - 1
+
+
+    def add_vline(self, x: Any, *, row: int|None = None, col: int|None = None, **props):
+        x_name, y_name = self._get_axis_names(row, col)
+        shape = dict(type='line', x0=x, x1=x, xref=x_name, y0=0, y1=1, yref=f'{y_name} domain', **props)
+        self._layout.setdefault('shapes', []).append(shape)
+
+
+    def update_layout(self, **props):
+        FigureBuilder._merge(self._layout, props)
+
+
+    def update_xaxes(self, *, row: int|None = None, col: int|None = None, **props):
+        x_name, _ = self._get_axis_names(row, col)
+        FigureBuilder._merge(self._layout.setdefault(x_name.replace('x', 'xaxis'), {}), props)
+
+
+    def update_yaxes(self, *, row: int|None = None, col: int|None = None, **props):
+        _, y_name = self._get_axis_names(row, col)
+        FigureBuilder._merge(self._layout.setdefault(y_name.replace('y', 'yaxis'), {}), props)
+
+
+    @property
+    def trace_count(self) -> int:
+        return len(self._data)
+
+
+    def build(self) -> dict:
+        fig = dict(data=self._data, layout=self._layout)
+        if FigureBuilder.validate:
+            logging.debug('Validating figure')
+            fig = go.Figure(copy.deepcopy(fig)).to_plotly_json()
+        return fig
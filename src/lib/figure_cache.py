@@ -0,0 +1,122 @@
+import os
+import pickle
+import logging
+import tempfile
+import collections
+import numpy as np
+from typing import Any
+
+
+
+class FigureCache:
+    """ LRU cache of rendered figures, keyed by a fingerprint (see <Config.fingerprint()>).
+
+    The in-memory tier keeps the figure together with its resampler (see <plot.Resampler>), so that e.g. zooming
+    can still re-query data; it is limited by the number of entries, and by their size in bytes (as far as the
+    figures and resamplers report it). If a directory is given (or set by the environment variable
+    CDV_FIGURE_CACHE_DIR), figures are also stored on disk, so they survive restarts; figures from disk come
+    without a resampler.
+    """
+
+
+    default_directory: str|None = os.environ.get('CDV_FIGURE_CACHE_DIR') or None
+
+
+    def __init__(self, max_entries: int = 16, directory: str|None = None, max_files: int = 256, max_bytes: int = 256*1024*1024):
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._max_files = max_files
+        self._directory = directory if directory is not None else FigureCache.default_directory
+        self._entries: collections.OrderedDict[str,tuple[dict,Any,int]] = collections.OrderedDict()
+        self._n_bytes = 0
+
+
+    def get(self, key: str) -> tuple[dict,Any]|None:
+        """ Returns (figure, resampler), with resampler being None if the figure was loaded from disk """
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            figure, resampler, _ = self._entries[key]
+            return figure, resampler
+
+        figure = self._load(key)
+        if figure is None:
+            return None
+        self._remember(key, figure, None)
+        return figure, None
+
+
+    def put(self, key: str, figure: dict, resampler: Any = None):
+        self._remember(key, figure, resampler)
+        self._store(key, figure)
+
+
+    def clear(self):
+        self._entries.clear()
+        self._n_bytes = 0
+
+
+    def _remember(self, key: str, figure: dict, resampler: Any):
+        if key in self._entries:
+            self._n_bytes -= self._entries.pop(key)[2]
+        n_bytes = FigureCache._get_size(figure) + getattr(resampler, 'nbytes', 0)
+        self._entries[key] = (figure, resampler, n_bytes)
+        self._n_bytes += n_bytes
+        while len(self._entries) > self._max_entries or (self._n_bytes > self._max_bytes and len(self._entries) > 0):
+            self._n_bytes -= self._entries.popitem(last=False)[1][2]
+
+
+    @staticmethod
+    def _get_size(obj: Any) -> int:
+        """ The approximate size of the data in a figure; only arrays and strings are counted """
+        if isinstance(obj, np.ndarray):
+            return obj.nbytes if obj.dtype != object else sum([FigureCache._get_size(v) for v in obj.flat])
+        if isinstance(obj, str):
+            return len(obj)
+        if isinstance(obj, dict):
+            return sum([FigureCache._get_size(v) for v in obj.values()])
+        if isinstance(obj, (list, tuple)):
+            return sum([FigureCache._get_size(v) for v in obj])
+        return 8
+
+
+    def _get_path(self, key: str) -> str:
+        return os.path.join(self._directory, f'{key}.pickle')
+
+
+    def _load(self, key: str) -> dict|None:
+        if not self._directory:
+            return None
+        path = self._get_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'rb') as fp:
+                figure = pickle.load(fp)
+            os.utime(path)  # keep recently used files when pruning
+            return figure
+        except Exception as ex:
+            logging.warning(f'Unable to read cached figure <{path}> ({ex})')
+            return None
+
+
+    def _store(self, key: str, figure: dict):
+        if not self._directory:
+            return
+        try:
+            os.makedirs(self._directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=self._directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as fp:
+                pickle.dump(figure, fp, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self._get_path(key))
+            self._prune()
+        except Exception as ex:
+            logging.warning(f'Unable to write figure to cache ({ex})')
+
+
+    def _prune(self):
+        files = [entry for entry in os.scandir(self._directory) if entry.name.endswith('.pickle')]
+        if len(files) <= self._max_files:
+            return
+        files.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in files[:len(files)-self._max_files]:
+            os.remove(entry.path)
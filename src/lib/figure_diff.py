@@ -0,0 +1,84 @@
+import numpy as np
+from typing import Any
+
+
+
+def _flatten(props: dict, prefix: str = '') -> dict[str,Any]:
+    """ Flattens nested dicts to Plotly property paths, e.g. {'marker': {'color': 'red'}} -> {'marker.color': 'red'}; empty dicts are omitted """
+    result = {}
+    for key,value in props.items():
+        path = prefix + key
+        if isinstance(value, dict):
+            result.update(_flatten(value, path + '.'))
+        else:
+            result[path] = value
+    return result
+
+
+def _equal(a: Any, b: Any) -> bool:
+    if a is b:
+        return True
+    if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+        a, b = np.asarray(a), np.asarray(b)
+        if a.shape != b.shape or a.dtype.kind != b.dtype.kind:
+            return False
+        if a.dtype.kind in 'fc':
+            return np.array_equal(a, b, equal_nan=True)
+        return np.array_equal(a, b)
+    if isinstance(a, (list,tuple)) and isinstance(b, (list,tuple)):
+        return len(a) == len(b) and all(_equal(ai, bi) for ai,bi in zip(a, b))
+    try:
+        return bool(a == b)
+    except Exception:
+        return False
+
+
+def _diff_props(old: dict, new: dict) -> dict[str,Any]:
+    old_flat, new_flat = _flatten(old), _flatten(new)
+    changes = {path: value for path,value in new_flat.items() if path not in old_flat or not _equal(old_flat[path], value)}
+    for path in old_flat.keys() - new_flat.keys():
+        changes[path] = None  # reset to default
+    return changes
+
+
+def _has_nested_paths(changes: dict[str,Any]) -> bool:
+    """ Checks if any path is the parent of another one, which Plotly refuses to set simultaneously """
+    paths = set(changes.keys())
+    for path in paths:
+        parts = path.split('.')
+        if any('.'.join(parts[:n]) in paths for n in range(1, len(parts))):
+            return True
+    return False
+
+
+def diff_figures(old: dict|None, new: dict) -> tuple[list[tuple[int,dict]],dict]|None:
+    """ Finds the differences between two figure-dicts (as returned by <go.Figure.to_plotly_json()>).
+
+    Returns a tuple (restyles, relayout), with restyles being a list of (trace-index, {property-path: value}),
+    and relayout being a dict {property-path: value}, so that the changes can be applied by Plotly.restyle()
+    and Plotly.relayout(). If the figure structure has changed (i.e. different number or types of traces), or
+    if a property and one of its sub-properties would have to be set at once, None is returned, and the whole
+    figure must be re-drawn.
+    """
+
+    if old is None:
+        return None
+    old_data, new_data = old.get('data', []), new.get('data', [])
+    if len(old_data) != len(new_data):
+        return None
+    if any(old_trace.get('type') != new_trace.get('type') for old_trace,new_trace in zip(old_data, new_data)):
+        return None
+
+    restyles = []
+    for index,(old_trace,new_trace) in enumerate(zip(old_data, new_data)):
+        changes = _diff_props(old_trace, new_trace)
+        if _has_nested_paths(changes):
+            return None
+        if len(changes) > 0:
+            restyles.append((index, changes))
+
+    relayout = _diff_props(old.get('layout', {}), new.get('layout', {}))
+    if _has_nested_paths(relayout):
+        return None
+
+    return restyles, relayout
@@ -0,0 +1,60 @@
+import os
+import hashlib
+import logging
+import tempfile
+import polars as pl
+from .progress import Progress
+
+
+
+def scan_csv(path: str, separator: str, progress: Progress|None = None) -> pl.LazyFrame:
+    """ Scans a CSV file, with the lines starting with "#" being collected in the column "_file_comment" """
+    comment_list = []
+    with open(path, 'r') as fp:
+        for line_number,line in enumerate(fp):
+            if progress is not None and line_number % 100_000 == 0:
+                progress.check()
+            if line.startswith('#'):
+                comment_list.append(line.strip())
+    comment = '\n'.join(comment_list)
+    df = pl.scan_csv(path, comment_prefix='#', separator=separator)
+    return df.with_columns(pl.lit(comment).alias('_file_comment'))
+
+
+
+class ParseCache:
+    """ Keeps parsed CSV files as Parquet files in a directory, so that each file is only parsed once.
+
+    Entries are keyed by path, size, modification time and separator, so they are invalidated by changes of the
+    file. The directory may be shared by multiple processes; entries are written atomically.
+    """
+
+
+    def __init__(self, directory: str):
+        self._directory = directory
+
+
+    def _get_path(self, path: str, separator: str) -> str:
+        stat = os.stat(path)
+        key = '\n'.join([os.path.abspath(path), str(stat.st_size), str(stat.st_mtime_ns), separator])
+        return os.path.join(self._directory, hashlib.sha256(key.encode('utf-8')).hexdigest() + '.parquet')
+
+
+    def scan(self, path: str, separator: str, progress: Progress|None = None) -> pl.LazyFrame:
+        """ Like <scan_csv()>, but from the cache, if possible """
+        cache_path = self._get_path(path, separator)
+        if os.path.exists(cache_path):
+            logging.debug(f'Using cached <{path}>')
+            return pl.scan_parquet(cache_path)
+
+        df = scan_csv(path, separator, progress)
+        df = progress.collect(df) if progress is not None else df.collect()
+        try:
+            os.makedirs(self._directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=self._directory, suffix='.tmp')
+            os.close(fd)
+            df.write_parquet(temp_path)
+            os.replace(temp_path, cache_path)
+        except Exception as ex:
+            logging.warning(f'Unable to cache <{path}> ({ex})')
+        return df.lazy()
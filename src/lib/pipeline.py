@@ -0,0 +1,240 @@
+from .config import Config, ConfigSection, Relation, Sort, FilterMode, ColumnRole
+from .shortstr import shorten_string_list
+from .plot import Plot, Resampler
+from .figure_cache import FigureCache
+from .parse_cache import ParseCache, scan_csv
+from .progress import Progress, Cancelled
+
+import enum
+import pathlib
+import logging
+import polars as pl
+
+
+
+class Stage(enum.Enum):
+    Load = enum.auto()
+    Filter = enum.auto()
+    Plot = enum.auto()
+
+
+
+class Pipeline:
+    """ Runs the load, filter and plot stages, but only re-executes a stage if anything it depends on has changed """
+
+
+    DEPENDENCIES = {
+        Stage.Load: [ConfigSection.Input],
+        Stage.Filter: [ConfigSection.Filters, ConfigSection.Sorting],
+        Stage.Plot: [ConfigSection.Plot, ConfigSection.Roles, ConfigSection.Styles],
+    }
+
+
+    def __init__(self, config: Config, figure_cache: FigureCache|None = None, parse_cache: ParseCache|None = None):
+        self.config = config
+        self.figure_cache = figure_cache
+        self.parse_cache = parse_cache
+        self.figure: dict|None = None
+        self.figure_fingerprint: str|None = None  # of the config that <figure> was rendered from, see <Config.fingerprint()>
+        self._resampler: Resampler|None = None
+        self._executed_keys: dict[Stage,tuple] = {}
+        self._progress = Progress()
+
+
+    def invalidate(self, stage: Stage = Stage.Load):
+        """ Forces the given stage, and all stages downstream of it, to be re-executed on the next run """
+        for s in Stage:
+            if s.value >= stage.value:
+                self._executed_keys.pop(s, None)
+
+
+    def run(self, until: Stage = Stage.Plot, progress: Progress|None = None, snap: Config|None = None) -> dict|None:
+        """ Runs all stages up to <until>; if cancelled through <progress>, <Cancelled> is raised, and the interrupted stage will be re-executed on the next run.
+
+        The stages use the settings of <snap> (by default, a snapshot taken now), so the config may be changed while
+        the pipeline is running in another thread; such changes are picked up by the next run. In that case, the
+        caller must also add the setups of newly loaded columns to the config (see <Config.ensure_setups_exist()>);
+        otherwise, this is done here.
+        """
+        self._progress = progress or Progress()
+        owns_config = snap is None
+        snap = snap or self.config.snapshot()
+        for stage in Stage:
+            if stage.value > until.value:
+                break
+            if stage == Stage.Filter and owns_config:
+                self.config.ensure_setups_exist()
+                snap = self.config.snapshot()
+            snap = snap.with_attributes_of(self.config).with_missing_setups()  # with the data of the previous stages
+            key = self._get_key(stage, snap)
+            if self._executed_keys.get(stage) == key:
+                continue
+            logging.debug(f'Executing stage {stage.name}')
+            self.invalidate(stage)
+            match stage:
+                case Stage.Load: self.load(snap)
+                case Stage.Filter: self.filter(snap)
+                case Stage.Plot: self.plot(snap)
+            self._executed_keys[stage] = key
+        return self.figure
+
+
+    def _get_key(self, stage: Stage, snap: Config) -> tuple:
+        versions = tuple([self.config.section_version(section, snap) for section in Pipeline.DEPENDENCIES[stage]])
+        match stage:
+            case Stage.Load: return versions
+            case Stage.Filter: return (versions, self.config.raw_df_version)
+            case Stage.Plot: return (versions, self.config.df_version)
+        raise ValueError()
+
+
+    def _is_loaded_data_current(self, snap: Config) -> bool:
+        """ Checks if <raw_df> was loaded (or restored from a session) from the same input, and the files did not change since """
+        source = self.config.raw_df_source
+        if source is None:
+            return False
+        current = snap.get_input_state()
+        if source['csv_separator'] != current['csv_separator']:
+            return False
+        if [state[0] for state in source['files']] != [state[0] for state in current['files']]:
+            return False
+        for (path,loaded_size,loaded_mtime),(_,size,mtime) in zip(source['files'], current['files']):
+            if size is None:
+                logging.info(f'Source file <{path}> not found; using the data that was loaded before')
+            elif (size,mtime) != (loaded_size,loaded_mtime):
+                logging.info(f'Source file <{path}> has changed since it was loaded')
+                return False
+        return True
+
+
+    def load(self, snap: Config|None = None):
+        snap = snap or self.config.snapshot()
+
+        if self._is_loaded_data_current(snap):
+            logging.info('Using the data that is already loaded')
+            return
+
+        source = snap.get_input_state()  # before reading, so that changes while reading are detected later
+
+        file_names = shorten_string_list([pathlib.Path(path).name for path in snap.input.files])
+
+        dfs = []
+        for index,(path,name) in enumerate(zip(snap.input.files,file_names)):
+            try:
+                logging.info(f'Loading <{path}>')
+                self._progress.report(f'Loading {name} ({index+1}/{len(file_names)})', index/len(file_names), force=True)
+                if self.parse_cache is not None:
+                    df = self.parse_cache.scan(path, snap.input.csv_separator, self._progress)
+                else:
+                    df = scan_csv(path, snap.input.csv_separator, self._progress)
+                df = df.with_columns([
+                    pl.lit(name).alias('_file_name'),
+                    pl.lit(path).alias('_file_path'),
+                    pl.lit(len(dfs)).alias('_file_id'),
+                ])
+                df = df.with_row_index(name='_file_row_id')
+                dfs.append(self._progress.collect(df))
+            except Cancelled:
+                raise
+            except Exception as ex:
+                logging.error(f'Loading <{path}> failed ({ex})')
+
+        if len(dfs) == 1:
+            df = dfs[0]
+        elif len(dfs) > 1:
+            df = pl.concat(dfs)
+        else:
+            df = pl.DataFrame()
+        df = df.with_row_index(name='_row_id')
+
+        self.config.raw_df = df
+        self.config.raw_df_source = source
+
+
+    def filter(self, snap: Config|None = None):
+        snap = snap or self.config.snapshot()
+
+        conditions = None
+        sort_cols, sort_desc = [], []
+
+        # TODO: the sorting should depend on the order in those 3 roles
+
+        for col_setup in snap.col_setups:
+            if col_setup.col not in snap.all_columns:
+                logging.warning(f'Ignoring setup of non-existing column "{col_setup.col}"')
+                continue
+
+            condition = None
+            if col_setup.filter.mode == FilterMode.Expression:
+                raise NotImplementedError('Expression filtering is not implemented yet')
+            elif col_setup.filter.mode == FilterMode.Comparison:
+                match col_setup.filter.cmp_rel:
+                    case Relation.Equal: condition = pl.col(col_setup.col)==col_setup.filter.cmp_value
+                    case Relation.NotEqual: condition = pl.col(col_setup.col)!=col_setup.filter.cmp_value
+                    case Relation.Greater: condition = pl.col(col_setup.col)>col_setup.filter.cmp_value
+                    case Relation.GreaterOrEqual: condition = pl.col(col_setup.col)>=col_setup.filter.cmp_value
+                    case Relation.Less: condition = pl.col(col_setup.col)<col_setup.filter.cmp_value
+                    case Relation.LessOrEqual: condition = pl.col(col_setup.col)<=col_setup.filter.cmp_value
+                    case Relation.In: condition = pl.col(col_setup.col).is_between(col_setup.filter.cmp_value,col_setup.filter.cmp_value2,closed='both')
+                    case Relation.NotIn: condition = ~pl.col(col_setup.col).is_between(col_setup.filter.cmp_value,col_setup.filter.cmp_value2,closed='both')
+                    case _: raise ValueError()
+            elif col_setup.filter.mode == FilterMode.Selection:
+                condition = pl.col(col_setup.col).is_in(col_setup.filter.selection)
+            elif col_setup.filter.mode == FilterMode.Off:
+                pass
+            else: raise ValueError()
+            if condition is not None:
+                if conditions is None:
+                    conditions = condition
+                else:
+                    conditions = conditions & (condition)
+
+        for role in [ColumnRole.Y, ColumnRole.X, ColumnRole.Group]:
+            for switch in snap.get_switches(role):
+                col = switch.col
+                setup = snap.find_setup(col)
+                if setup.sort == Sort.Asc:
+                    sort_cols.append(setup.col)
+                    sort_desc.append(False)
+                if setup.sort == Sort.Desc:
+                    sort_cols.append(setup.col)
+                    sort_desc.append(True)
+
+        self._progress.report('Filtering', force=True)
+        df = snap.raw_df.lazy()
+        if conditions is not None:
+            df = df.filter(conditions)
+        if len(sort_cols) >= 1:
+            logging.info(f'Sorting by {sort_cols}')
+            df = df.sort(by=sort_cols, descending=sort_desc)
+        self.config.df = self._progress.collect(df)
+        logging.info(f'Dataframe shape: {self.config.df.shape}')
+
+
+    def plot(self, snap: Config|None = None):
+        snap = snap or self.config.snapshot()
+        self.figure, self.figure_fingerprint, self._resampler = None, None, None
+        
+        self._progress.check()
+        key = snap.fingerprint()
+        if self.figure_cache is not None:
+            cached = self.figure_cache.get(key)
+            if cached is not None:
+                logging.debug(f'Using cached figure')
+                self.figure, self._resampler = cached
+                self.figure_fingerprint = key
+                return
+
+        plot = Plot(snap, self._progress)
+        self.figure = plot.plot()
+        self.figure_fingerprint = key
+        self._resampler = plot.resampler  # not the plot, which refers to the data frames
+        if self.figure_cache is not None and self.figure is not None:
+            self.figure_cache.put(key, self.figure, plot.resampler)
+
+
+    def requery(self, x_range: tuple[float,float]|None, y_range: tuple[float,float]|None = None) -> tuple[list[tuple[int,dict]],dict]:
+        """ Re-samples the downsampled traces of the current figure for the given range (see Resampler.requery) """
+        if self._resampler is None:
+            return [], {}
+        return self._resampler.requery(x_range, y_range)
@@ -1,5 +1,9 @@
-from lib.config import Config, Relation, Sort, FilterMode, ColumnRole, PlotType, MatrixDiagonalPlotType, MatrixTrianglePlotType
+from lib.config import Config, ConfigPlot, Relation, Sort, FilterMode, ColumnRole, PlotType, MatrixDiagonalPlotType, MatrixTrianglePlotType, DownsampleMethod, WebGlMode, TraceBatching, HeatmapAggregation, Aggregation, AggregationBand
 from lib.utils import reverse_lookup
+from lib import downsample, sampling, raster
+from lib.figure_builder import FigureBuilder
+from lib.stat_matrix import StatMatrix
+from lib.progress import Progress
 
 import os, pathlib
 import sys
@@ -10,99 +14,230 @@ import polars as pl
 import numpy as np
 import plotly, plotly.express, plotly.validators.scatter.marker
 import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 from typing import Callable
-import scipy.stats
+
+
+
+class TraceSource:
+    """ Full-resolution data of a downsampled trace, so that a zoomed-in range can be re-queried later """
+
+
+    def __init__(self, point_data: dict[str,np.ndarray], use_lines: bool):
+        self.point_data = point_data
+        self.use_lines = use_lines
+        x = downsample.as_float(point_data['x'])
+        if np.all(x[1:] >= x[:-1]):
+            self._order = None
+            self._sorted_x = x
+        else:
+            self._order = np.argsort(x, kind='stable')
+            self._sorted_x = x[self._order]
+    
+
+    def get_indices_in_range(self, x0: float|np.datetime64, x1: float|np.datetime64) -> np.ndarray:
+        x0, x1 = self._to_sorted_units(x0), self._to_sorted_units(x1)
+        # include one more point on each side, so that lines continue up to the edge of the plot
+        i0 = max(0, np.searchsorted(self._sorted_x, x0, side='left') - 1)
+        i1 = min(len(self._sorted_x), np.searchsorted(self._sorted_x, x1, side='right') + 1)
+        if self._order is None:
+            return np.arange(i0, i1)
+        return np.sort(self._order[i0:i1])
+
+
+    def _to_sorted_units(self, value: float|np.datetime64) -> float:
+        """ Converts a bound of the visible range to the units that <downsample.as_float()> gives for the X values """
+        x = self.point_data['x']
+        if np.issubdtype(x.dtype, np.datetime64):
+            if not isinstance(value, np.datetime64):
+                value = np.datetime64(int(round(value)), 'ms')  # numeric positions on a date axis are in milliseconds
+            return float(value.astype(x.dtype).view(np.int64))
+        if isinstance(value, np.datetime64):
+            raise ValueError(f'Cannot compare a date to X values of type {x.dtype}')
+        return float(value)
+
+
+    @property
+    def nbytes(self) -> int:
+        return sum([v.nbytes for v in self.point_data.values()]) + self._sorted_x.nbytes + (self._order.nbytes if self._order is not None else 0)
+
+
+
+class Resampler:
+    """ Re-samples the downsampled traces (and re-rasterizes the raster image) of a figure for a zoomed-in range.
+
+    It only keeps the data of those traces and the plot settings, but not the config with its data frames, so it
+    can be cached along with the figure.
+    """
+
+
+    def __init__(self, plot_config: ConfigPlot, color_palette: np.ndarray):
+        self._plot_config = plot_config
+        self._color_palette = color_palette
+        self.trace_sources: dict[int,TraceSource] = {}
+        self.raster_args: dict|None = None
+
+
+    @property
+    def nbytes(self) -> int:
+        """ The (approximate) memory used by the data """
+        n = sum([source.nbytes for source in self.trace_sources.values()])
+        if self.raster_args is not None:
+            n += self.raster_args['df'].estimated_size()
+        return n
+
+
+    def requery(self, x_range: tuple[float,float]|None, y_range: tuple[float,float]|None = None) -> tuple[list[tuple[int,dict[str,np.ndarray]]],dict]:
+        """ Re-samples all downsampled traces (and re-rasterizes the raster image) for the given visible range (or the whole range, if None).
+        
+        Returns a list of (trace-index, {property-path: data}) for each trace that must be updated, and a dict
+        {property-path: value} of layout changes.
+        """
+
+        relayout = {}
+        if self.raster_args is not None:
+            relayout = {f'images[0].{k}': v for k,v in self.render_raster(x_range, y_range).items()}
+
+        updates = []
+        for trace_index,source in self.trace_sources.items():
+            if x_range is None:
+                visible = np.arange(len(source.point_data['x']))
+            else:
+                visible = source.get_indices_in_range(*x_range)
+            if source.point_data['y'].ndim > 1:
+                y = source.point_data['y'][-1,visible]
+            else:
+                y = source.point_data['y'][visible]
+            indices = self.get_downsample_indices(source.point_data['x'][visible], y, source.use_lines)
+            if indices is not None:
+                visible = visible[indices]
+            updates.append((trace_index, {k: v[...,visible] for k,v in source.point_data.items()}))
+        return updates, relayout
+
+
+    def get_downsample_indices(self, x: np.ndarray, y: np.ndarray, use_lines: bool) -> np.ndarray|None:
+        n_max = self._plot_config.max_points_per_trace
+        if self._plot_config.downsample_method == DownsampleMethod.Off or n_max <= 0 or y.shape[-1] <= n_max:
+            return None
+        
+        if x.ndim > 1:
+            x = x[-1]  # multiple columns for one axis; use the finest one
+        if y.ndim > 1:
+            y = y[-1]
+        
+        if not use_lines:
+            indices = downsample.density_indices(x, y, n_max)
+        elif self._plot_config.downsample_method == DownsampleMethod.LTTB:
+            indices = downsample.lttb_indices(x, y, n_max)
+        else:
+            indices = downsample.minmax_indices(y, n_max)
+        logging.debug(f'Downsampled trace from {y.shape[-1]} to {len(indices)} points')
+        return indices
+
+
+    def render_raster(self, x_range: tuple[float,float]|None, y_range: tuple[float,float]|None) -> dict:
+        """ Rasterizes the given range (or the whole data, if None) into a layout image """
+        args = self.raster_args
+        x_range = x_range or raster.get_range(args['df'], args['x_col'])
+        y_range = y_range or raster.get_range(args['df'], args['y_col'])
+        width, height = max(1, self._plot_config.raster_width), max(1, self._plot_config.raster_height)
+        
+        counts, means = raster.aggregate(args['df'], args['x_col'], args['y_col'], x_range, y_range, width, height,
+            value_col=args['value_col'], category_col=args['category_col'], n_categories=len(self._color_palette))
+        category_colors = list(self._color_palette) if args['category_col'] is not None else None
+        rgba = raster.shade(counts, plotly.express.colors.sequential.Viridis, means=means, category_colors=category_colors)
+        
+        return dict(source=raster.to_png_data_uri(rgba), xref='x', yref='y', x=x_range[0], y=y_range[1],
+            sizex=x_range[1]-x_range[0], sizey=y_range[1]-y_range[0], sizing='stretch', layer='below')
 
 
 
 class Plot:
 
 
-    def __init__(self, config: Config):
+    # symbols that can be rendered in WebGL traces (the line-only ones would be invisible)
+    WEBGL_MARKERS = ['circle', 'square', 'diamond', 'cross', 'x', 'pentagon', 'hexagon', 'hexagon2', 'octagon', 'star', 'hexagram', 'hourglass', 'bowtie', 'arrow']
+    WEBGL_DASHES = ['solid', 'dot', 'dash', 'longdash', 'dashdot', 'longdashdot']
+
+
+    _colors: np.ndarray|None = None
+    _markers: np.ndarray|None = None
+
+
+    def __init__(self, config: Config, progress: Progress|None = None):
         self._config = config
-        self._color_map = {}
-        self._marker_map = {}
+        self._progress = progress or Progress()
         self._range_map = {}
+        self.resampler = Resampler(config.plot.snapshot(), self._color_palette)
 
 
-    def plot(self) -> go.Figure:
+    def plot(self) -> dict|None:
+        """ Returns the figure as a dict, like <go.Figure.to_plotly_json()> would """
         match self._config.plot.type:
             case PlotType.Scatter: return self.scatter()
-            case PlotType.Heatmap: return self.scatter(segmented_y_axis=True)
+            case PlotType.Heatmap: return self.heatmap()
             case PlotType.Scatter3D: return self.scatter(three_d=True)
             case PlotType.StatMatrix: return self.scatter_matrix()
+            case PlotType.Raster: return self.raster()
             case _: raise RuntimeError()
 
 
-    def scatter_matrix(self) -> go.Figure:
+    def scatter_matrix(self) -> dict:
 
         df = self._config.df
         cols = self._extract('group', self._config.cols_group, lambda col: col.active, n_min=2)
         dim = len(cols)
-
-        MAX_POINTS = 2_000
+        stats = StatMatrix(df, cols)
+        sample = self._get_sample_indices(self._get_strata_cols() if self._config.plot.matrix_stratified_sampling else [])
 
         def make_diagonal_plot(i: int):
             if self._config.plot.matrix_diagonal_type == MatrixDiagonalPlotType.Off:
                 return
             loc = dict(row=i+1, col=i+1)
-            data = df.get_column(cols[i]).to_numpy()
+            data = stats.column(i)
             if self._config.plot.matrix_diagonal_type == MatrixDiagonalPlotType.Histogram:
                 hist, bin_edges = np.histogram(data, density=False, bins=math.ceil(5*math.log(len(data))))
                 bins = (bin_edges[1:]+bin_edges[:-1])/2
                 idx_empty = hist==0
                 hist, bins = np.delete(hist,idx_empty), np.delete(bins,idx_empty)
-                fig.add_trace(go.Bar(x=bins, y=hist), **loc)
-                mean, sdev = np.mean(data), np.std(data,ddof=1)
+                fig.add_trace('bar', x=bins, y=hist, **loc)
+                mean, sdev = stats.mean[i], stats.std[i]
                 fig.add_vline(x=mean-sdev, line=dict(dash='dot', color='black'), **loc, opacity=0.67)
                 fig.add_vline(x=mean, line=dict(dash='dashdot', color='black'), **loc, opacity=0.67)
                 fig.add_vline(x=mean+sdev, line=dict(dash='dot', color='black'), **loc, opacity=0.67)
             elif self._config.plot.matrix_diagonal_type == MatrixDiagonalPlotType.RunSequence:
-                if len(data) <= MAX_POINTS:
-                    data_to_plot = data
-                else:
-                    data_to_plot = np.random.choice(data, size=MAX_POINTS)
-                fig.add_trace(go.Scatter(y=data_to_plot), **loc)
-                y0, y1 = np.min(data), np.max(data)
+                fig.add_trace('scatter', x=sample, y=data[sample], **loc)
+                y0, y1 = stats.min[i], stats.max[i]
                 ref_x = [0, len(data)-1]
                 ref_y = [y0, y1]
-                fig.add_trace(go.Scatter(x=ref_x, y=ref_y, mode='lines', line=dict(dash='dot', color='black'), opacity=0.33), **loc)
+                fig.add_trace('scatter', x=ref_x, y=ref_y, mode='lines', line=dict(dash='dot', color='black'), opacity=0.33, **loc)
             else: raise ValueError()
 
         def make_triangle_plot(x: int, y: int, typ: MatrixTrianglePlotType):
             if typ == MatrixTrianglePlotType.Off:
                 return
             loc = dict(row=y+1, col=x+1)
-            data_x = df.get_column(cols[x]).to_numpy()
-            data_y = df.get_column(cols[y]).to_numpy()
-            x0, x1 = np.min(data_x), np.max(data_x)
+            data_x, data_y = stats.column(x), stats.column(y)
+            x0, x1 = stats.min[x], stats.max[x]
             if typ == MatrixTrianglePlotType.Scatter:
-                if len(data_x) <= MAX_POINTS:
-                    data_x_to_plot, data_y_to_plot = data_x, data_y
-                else:
-                    indices = np.random.choice(np.linspace(0, len(data_x)-1, len(data_x), dtype=int), size=MAX_POINTS)
-                    data_x_to_plot, data_y_to_plot = data_x[indices], data_y[indices]
-                fig.add_trace(go.Scatter(x=data_x_to_plot, y=data_y_to_plot, mode='markers', marker=dict(opacity=0.5)), **loc)
-                reg = scipy.stats.linregress(data_x, data_y)
+                fig.add_trace('scatter', x=data_x[sample], y=data_y[sample], mode='markers', marker=dict(opacity=0.5), **loc)
+                slope, intercept = stats.regression(x, y)
                 reg_x = [x0, x1]
-                reg_y = [reg.intercept, reg.intercept+reg.slope*x1]
-                fig.add_trace(go.Scatter(x=reg_x, y=reg_y, mode='lines', line=dict(dash='dash', color='black'), opacity=0.67), **loc)
+                reg_y = [intercept+slope*x0, intercept+slope*x1]
+                fig.add_trace('scatter', x=reg_x, y=reg_y, mode='lines', line=dict(dash='dash', color='black'), opacity=0.67, **loc)
             elif typ == MatrixTrianglePlotType.QQ:
-                quant_x = np.percentile(data_x, np.linspace(0, 100, 101))
-                quant_y = np.percentile(data_y, np.linspace(0, 100, 101))
-                fig.add_trace(go.Scatter(x=quant_x, y=quant_y), **loc)
-                y0, y1 = np.min(data_y), np.max(data_y)
+                fig.add_trace('scatter', x=stats.quantiles[x], y=stats.quantiles[y], **loc)
+                y0, y1 = stats.min[y], stats.max[y]
                 ref_x = [x0, x1]
                 ref_y = [y0, y1]
-                fig.add_trace(go.Scatter(x=ref_x, y=ref_y, mode='lines', line=dict(dash='dot', color='black'), opacity=0.33), **loc)
+                fig.add_trace('scatter', x=ref_x, y=ref_y, mode='lines', line=dict(dash='dot', color='black'), opacity=0.33, **loc)
             elif typ == MatrixTrianglePlotType.Off:
                 pass
             else: raise ValueError()
 
-        fig = make_subplots(rows=dim, cols=dim)
+        fig = FigureBuilder(rows=dim, cols=dim)
         for x in range(dim):
             for y in range(dim):
+                self._progress.report(f'Building cell {x*dim+y+1}/{dim*dim}', (x*dim+y)/(dim*dim))
                 if x > y:
                     make_triangle_plot(x, y, self._config.plot.matrix_lower_triangle_type)
                 elif x < y:
@@ -111,18 +246,126 @@ class Plot:
                     make_diagonal_plot(x)
         
         for x in range(dim):
-            fig.update_xaxes(title_text=cols[x], row=dim, col=x+1)
-            fig.update_yaxes(title_text=cols[x], row=x+1, col=1)
+            fig.update_xaxes(title=dict(text=cols[x]), row=dim, col=x+1)
+            fig.update_yaxes(title=dict(text=cols[x]), row=x+1, col=1)
+        
+        fig.update_layout(showlegend=False, uirevision=self._make_uirevision(cols))
+        
+        return fig.build()
+
+
+    def heatmap(self) -> dict|None:
+
+        df = self._config.df
+        x_col = self._extract('X', self._config.cols_x, lambda col: col.active, n_min=1, n_max=1, as_list=False)
+        y_col = self._extract('Y', self._config.cols_y, lambda col: col.active, n_min=1, n_max=1, as_list=False)
+        z_col = self._extract('Z', self._config.cols_z, lambda col: col.active, n_max=1, as_list=False)
+        if any(col.active for col in self._config.cols_group):
+            logging.warning(f'Grouping is ignored for heatmaps')
+        
+        aggregation = self._config.plot.heatmap_aggregation if z_col is not None else HeatmapAggregation.Count
+        logging.info(f'X: {x_col}; Y: {y_col}; Z: {z_col}; Aggregation: {aggregation}')
+
+        n_max = max(1, self._config.plot.heatmap_max_bins)
+        x_bin, x_values = self._get_bins(df, x_col, n_max)
+        y_bin, y_values = self._get_bins(df, y_col, n_max)
+        
+        match aggregation:
+            case HeatmapAggregation.Count: agg = pl.len()
+            case HeatmapAggregation.Mean: agg = pl.col(z_col).mean()
+            case HeatmapAggregation.Min: agg = pl.col(z_col).min()
+            case HeatmapAggregation.Max: agg = pl.col(z_col).max()
+            case _: raise ValueError()
+        
+        cells = df.lazy() \
+            .select(x_bin.alias('_x_bin'), y_bin.alias('_y_bin'), *([pl.col(z_col)] if z_col is not None else [])) \
+            .drop_nulls(['_x_bin', '_y_bin']) \
+            .group_by('_x_bin', '_y_bin') \
+            .agg(agg.cast(pl.Float64).alias('_value')) \
+            .collect()
+        
+        z = np.full((len(y_values), len(x_values)), np.nan)
+        z[cells.get_column('_y_bin').to_numpy(), cells.get_column('_x_bin').to_numpy()] = cells.get_column('_value').to_numpy()
+
+        value_title = 'count' if aggregation == HeatmapAggregation.Count else f'{aggregation}({z_col})'
+        fig = FigureBuilder()
+        fig.add_trace('heatmap', x=x_values, y=y_values, z=z, colorbar=dict(title=dict(text=value_title)))
+        fig.update_layout(
+            uirevision = self._make_uirevision([x_col], [y_col]),
+            xaxis = dict(title=dict(text=self._make_title(self._config.plot.x_title, [x_col]))),
+            yaxis = dict(title=dict(text=self._make_title(self._config.plot.y_title, [y_col]))),
+        )
+        return fig.build()
+
+
+    def raster(self) -> dict|None:
+
+        df = self._config.df
+        x_col = self._extract('X', self._config.cols_x, lambda col: col.active, n_min=1, n_max=1, as_list=False)
+        y_col = self._extract('Y', self._config.cols_y, lambda col: col.active, n_min=1, n_max=1, as_list=False)
+        z_col = self._extract('Z', self._config.cols_z, lambda col: col.active, n_max=1, as_list=False)
+        color_col = self._extract('color', self._config.col_setups, lambda col: col.as_color, n_max=1, as_list=False)
+        if any(col.active for col in self._config.cols_group):
+            logging.warning(f'Grouping is ignored for raster plots')
+        if z_col is not None and color_col is not None:
+            logging.warning(f'Color is ignored when a Z-column is given')
+            color_col = None
+        logging.info(f'X: {x_col}; Y: {y_col}; Z: {z_col}; Color: {color_col}')
+
+        if color_col is not None:
+            df = df.with_columns(self._encode_discrete(color_col, len(self._color_palette)).alias('_color_code'))
+        category_col = '_color_code' if color_col is not None else None
+        df = df.select(list(dict.fromkeys([col for col in [x_col, y_col, z_col, category_col] if col is not None])))  # not the other columns, as this is kept for re-querying
+        self.resampler.raster_args = dict(df=df, x_col=x_col, y_col=y_col, value_col=z_col, category_col=category_col)
+        
+        # the full range is marked by an invisible trace, so that auto-ranging the axes works as usual
+        (x0, x1), (y0, y1) = raster.get_range(df, x_col), raster.get_range(df, y_col)
+        fig = FigureBuilder()
+        fig.add_trace('scatter', x=[x0, x1], y=[y0, y1], mode='markers', marker=dict(opacity=0), hoverinfo='skip', showlegend=False)
+        fig.update_layout(
+            images = [self.resampler.render_raster(None, None)],
+            uirevision = self._make_uirevision([x_col], [y_col]),
+            xaxis = dict(title=dict(text=self._make_title(self._config.plot.x_title, [x_col]))),
+            yaxis = dict(title=dict(text=self._make_title(self._config.plot.y_title, [y_col]))),
+        )
+        return fig.build()
+
+
+
+
+    @staticmethod
+    def _get_bins(df: pl.DataFrame, col: str, n_max: int) -> tuple[pl.Expr,np.ndarray]:
+        """ Returns an expression for the bin index of each row, and the coordinate of each bin.
         
-        fig.update_layout(showlegend=False)
+        If the column has only a few distinct values (e.g. a sweep), each value gets its own bin; otherwise, the
+        value range is divided into <n_max> bins of equal width (dates and times are binned by their numeric
+        representation). Other columns (e.g. strings) with more than <n_max> distinct values cannot be binned.
+        """
+        series = df.get_column(col).drop_nulls()
+        if series.dtype.is_numeric():
+            series = series.filter(series.is_finite())
+        if series.n_unique() <= n_max:
+            unique = series.unique().sort()
+            return pl.col(col).replace_strict(unique, np.arange(len(unique)), default=None, return_dtype=pl.Int64), unique.to_numpy()
+        if not (series.dtype.is_numeric() or series.dtype.is_temporal()):
+            raise RuntimeError(f'Column "{col}" has {series.n_unique()} distinct values, which is more than the maximum number of bins ({n_max})')
         
-        return fig
+        physical = series.to_physical()
+        lo, hi = float(physical.min()), float(physical.max())
+        value = pl.col(col).to_physical().cast(pl.Float64)
+        index = ((value - lo) / (hi - lo) * n_max).floor().clip(0, n_max-1).cast(pl.Int64)
+        centers = lo + (np.arange(n_max) + 0.5) * (hi - lo) / n_max
+        if series.dtype.is_temporal():
+            centers = pl.Series(np.round(centers).astype(np.int64)).cast(physical.dtype).cast(series.dtype).to_numpy()
+        return pl.when(value.is_finite()).then(index), centers
 
 
-    def scatter(self, *, segmented_y_axis: bool = False, three_d: bool = False) -> go.Figure:
+    def scatter(self, *, segmented_y_axis: bool = False, three_d: bool = False) -> dict|None:
 
         df = self._config.df
-        fig = go.Figure()
+        fig = FigureBuilder()
+        traces_2d = []
+        trace_labels = []  # (legend prefix, style description, group description) of each 2D trace
 
         group_cols = self._extract('group', self._config.cols_group, lambda col: col.active)
         x_cols = self._extract('X', self._config.cols_x, lambda col: col.active, n_min=1, n_max=1 if three_d else None)
@@ -139,8 +382,26 @@ class Plot:
             logging.warning(f'Style is ignored for 3D')
             style_col = None
         
+        aggregate = self._config.plot.aggregation != Aggregation.Off
+        if aggregate and (three_d or segmented_y_axis or len(x_cols) > 1):
+            logging.warning(f'Aggregation is only supported for 2D plots with one X-column')
+            aggregate = False
+        
         logging.info(f'Groups: {group_cols}; X: {x_cols}; Y: {y_cols}; Z: {z_cols}; Color: {color_col}; Style: {style_col}; Size: {size_col}')
 
+        # the rows of each group are contiguous in the partitioned frame, so groups are just slices
+        df, group_keys, group_offsets = self._get_group_partitions(group_cols)
+
+        # dictionary-encode the style columns once, for the whole dataset
+        if color_col is not None:
+            df = df.with_columns(self._encode_discrete(color_col, len(self._color_palette)).alias('_color_code'))
+        if style_col is not None:
+            df = df.with_columns(self._encode_discrete(style_col, len(self._marker_palette)).alias('_style_code'))
+        
+        if aggregate:
+            style_cols = [col for col in [color_col, style_col, size_col, '_color_code' if color_col else None, '_style_code' if style_col else None] if col is not None]
+            df, group_offsets = self._aggregate(df, group_offsets, x_cols[0], y_cols, list(dict.fromkeys(style_cols)))
+
         def plot_group(group_tuple: tuple, df: pl.DataFrame):
             
             def format(x):
@@ -148,7 +409,7 @@ class Plot:
                     return f'{x:.6g}'
                 return str(x)
 
-            def add_to_plot(x: np.ndarray, y: np.ndarray, z: np.ndarray|None=None, *, data_col: str|None=None, can_use_lines: bool=True):
+            def add_to_plot(x: np.ndarray, y: np.ndarray, z: np.ndarray|None=None, *, data_col: str|None=None, can_use_lines: bool=True, band: tuple[np.ndarray,np.ndarray]|None=None):
 
                 if len(group_tuple) == 1:
                     legend = format(group_tuple[0])
@@ -163,30 +424,32 @@ class Plot:
                 
                 common_color = None
                 individual_colors = None
+                style_description = []
                 if color_col is not None:
-                    color_values = df.get_column(color_col)
-                    if len(set(color_values)) == 1:
-                        common_color = self._get_discrete_color(color_values[0])
+                    colors = self._color_palette[df.get_column('_color_code').to_numpy()]
+                    if np.all(colors == colors[0]):
+                        common_color = colors[0]
+                        style_description.append(f'{color_col}={format(df.get_column(color_col)[0])}')
                     else:
-                        individual_colors = [self._get_discrete_color(elem) for elem in color_values]#
+                        individual_colors = colors
                 
                 common_markers = None
                 individual_markers = None
                 if style_col is not None:
-                    style_values = df.get_column(style_col)
-                    if len(set(style_values)) == 1:
-                        common_markers = self._get_discrete_marker(style_values[0])
+                    markers = self._marker_palette[df.get_column('_style_code').to_numpy()]
+                    if np.all(markers == markers[0]):
+                        common_markers = markers[0]
+                        style_description.append(f'{style_col}={format(df.get_column(style_col)[0])}')
                     else:
-                        individual_markers = [self._get_discrete_marker(elem) for elem in style_values]
+                        individual_markers = markers
                 
                 individual_sizes = None
                 if size_col is not None:
-                    size_values = df.get_column(size_col)
-                    sizes = [self._get_relative_value(size_col, elem) for elem in size_values]
-                    individual_sizes = np.array(sizes)
+                    individual_sizes = self._get_relative_values(size_col, df.get_column(size_col).to_numpy())
 
                 line = dict()
                 marker = dict()
+                point_data = dict(x=x, y=y) if z is None else dict(x=x, y=y, z=z)
 
                 use_lines = can_use_lines and self._config.plot.scatter_lines
                 use_markers = False
@@ -196,18 +459,18 @@ class Plot:
                     marker['color'] = common_color
                 elif individual_colors is not None:
                     use_markers = True
-                    marker['color'] = individual_colors
+                    point_data['marker.color'] = individual_colors
                 
                 if common_markers is not None:
                     use_markers = True
                     marker['symbol'] = common_markers
                 if individual_markers is not None:
                     use_markers = True
-                    marker['symbol'] = individual_markers
+                    point_data['marker.symbol'] = individual_markers
 
                 if individual_sizes is not None:
                     use_markers = True
-                    marker['size'] = 5 + 15 * individual_sizes
+                    point_data['marker.size'] = 5 + 15 * individual_sizes
                 
                 if use_lines and use_markers:
                     mode = 'lines+markers'
@@ -216,21 +479,45 @@ class Plot:
                 else:
                     mode = 'markers'
 
+                source = None
+                indices = self.resampler.get_downsample_indices(x, y if z is None else z, use_lines)
+                if indices is not None:
+                    if z is None and x.ndim == 1:
+                        source = TraceSource(point_data, use_lines)
+                    point_data = {k: v[...,indices] for k,v in point_data.items()}
+                for k,v in point_data.items():
+                    if k.startswith('marker.'):
+                        marker[k.removeprefix('marker.')] = v
+
                 if z is not None:
-                    fig.add_trace(go.Scatter3d(x=x, y=y, z=z, name=legend, mode=mode, text=infos, line=line, marker=marker))
+                    fig.add_trace('scatter3d', x=point_data['x'], y=point_data['y'], z=point_data['z'], name=legend, mode=mode, text=infos, line=line, marker=marker)
                 else:
-                    fig.add_trace(go.Scatter(x=x, y=y, name=legend, mode=mode, text=infos, line=line, marker=marker))
-
-            x, x_unique = self._get_axis_values(df, x_cols)
+                    prefix = data_col if data_col is not None and len(y_cols) > 1 else ''
+                    legend_group = dict()
+                    if band is not None:
+                        # the band is drawn first, behind the line, and is shown/hidden together with it
+                        legend_group = dict(legendgroup=legend)
+                        fill_color = Plot._to_rgba(common_color, 0.2) if common_color else 'rgba(128,128,128,0.2)'
+                        traces_2d.append(dict(x=np.concatenate([x, x[::-1]]), y=np.concatenate([band[1], band[0][::-1]]), name=legend, mode='lines',
+                            line=dict(width=0), marker=dict(), fill='toself', fillcolor=fill_color, hoverinfo='skip', showlegend=False, **legend_group))
+                        trace_labels.append((prefix, ', '.join(style_description), legend))
+                    if source is not None:
+                        self.resampler.trace_sources[len(traces_2d)] = source
+                    traces_2d.append(dict(x=point_data['x'], y=point_data['y'], name=legend, mode=mode, text=infos, line=line, marker=marker, **legend_group))
+                    trace_labels.append((prefix, ', '.join(style_description), legend))
+
+            x = self._get_axis_values(df, x_cols)
+            x_unique = aggregate or x_uniqueness.get(group_tuple, False)
             
             if three_d:
-                y, y_unique = self._get_axis_values(df, y_cols)
+                y = self._get_axis_values(df, y_cols)
                 for z_col in z_cols:
                     z = df.get_column(z_col).to_numpy()
                     add_to_plot(x, y, z, data_col=z_col, can_use_lines=x_unique)
 
             elif segmented_y_axis:
-                y, y_unique = self._get_axis_values(df, y_cols)
+                y = self._get_axis_values(df, y_cols)
+                y_unique = self._get_axis_uniqueness(group_cols, y_cols).get(group_tuple, False)
                 
                 add_to_plot(x, y, can_use_lines=x_unique and y_unique)
 
@@ -238,84 +525,356 @@ class Plot:
 
                 for y_col in y_cols:
                     y = df.get_column(y_col).to_numpy()
-                    add_to_plot(x, y, data_col=y_col, can_use_lines=x_unique)
-
-        if len(group_cols) >= 1:
-            for group_tuple,dfg in df.group_by(group_cols, maintain_order=True):
-                plot_group(group_tuple, dfg)
-        else:
-            plot_group(tuple(), df)
+                    band = None
+                    if aggregate and f'_lo_{y_col}' in df.columns:
+                        band = (df.get_column(f'_lo_{y_col}').to_numpy(), df.get_column(f'_hi_{y_col}').to_numpy())
+                    add_to_plot(x, y, data_col=y_col, can_use_lines=x_unique, band=band)
+
+        x_uniqueness = self._get_axis_uniqueness(group_cols, x_cols) if not aggregate else {}
+        n_groups = len(group_keys)
+        for index,(group_tuple,start,end) in enumerate(zip(group_keys, group_offsets[:-1], group_offsets[1:])):
+            self._progress.report(f'Building traces for group {index+1}/{n_groups}', index/n_groups)
+            plot_group(group_tuple, df.slice(int(start), int(end - start)))
+        
+        if self._use_batching(len(traces_2d)):
+            logging.debug(f'Batching {len(traces_2d)} traces')
+            self._assign_default_colors(traces_2d)
+            traces_2d = self._batch_traces(traces_2d, trace_labels)
+
+        if len(traces_2d) > 0:
+            n_points = sum([np.shape(trace['x'])[-1] for trace in traces_2d])
+            if self._use_webgl(n_points):
+                logging.debug(f'Using WebGL for {n_points} points')
+                for trace in traces_2d:
+                    fig.add_trace('scattergl', **self._to_webgl(trace))
+            else:
+                for trace in traces_2d:
+                    fig.add_trace('scatter', **trace)
 
+        fig.update_layout(uirevision=self._make_uirevision(x_cols, y_cols, z_cols if three_d else []))
         if three_d:
             fig.update_layout(scene = dict(
-                xaxis = dict(title=self._make_title(self._config.plot.x_title, x_cols)),
-                yaxis = dict(title=self._make_title(self._config.plot.y_title, y_cols)),
-                zaxis = dict(title=self._make_title(self._config.plot.z_title, z_cols)),
+                xaxis = dict(title=dict(text=self._make_title(self._config.plot.x_title, x_cols))),
+                yaxis = dict(title=dict(text=self._make_title(self._config.plot.y_title, y_cols))),
+                zaxis = dict(title=dict(text=self._make_title(self._config.plot.z_title, z_cols))),
             ))
         else:
             fig.update_layout(
-                xaxis_title=self._make_title(self._config.plot.x_title, x_cols),
-                yaxis_title=self._make_title(self._config.plot.y_title, y_cols)
+                xaxis = dict(title=dict(text=self._make_title(self._config.plot.x_title, x_cols))),
+                yaxis = dict(title=dict(text=self._make_title(self._config.plot.y_title, y_cols))),
             )
-        return fig    
+        return fig.build()
         
 
-    def _get_color_swatch(self) -> list:
-        return plotly.express.colors.qualitative.Plotly
-    
+    def _get_strata_cols(self) -> list[str]:
+        """ The columns to stratify samples by: the color column, or else the file; columns with too many distinct values are not used """
+        color_col = self._extract('color', self._config.col_setups, lambda col: col.as_color, n_max=1, as_list=False)
+        col = color_col if color_col is not None else '_file_id'
+        if col not in self._config.df.columns:
+            return []
+        if self._config.df.get_column(col).n_unique() > self._config.plot.matrix_max_points // 10:
+            logging.warning(f'Column "{col}" has too many distinct values to stratify the sample; sampling uniformly')
+            return []
+        return [col]
+
+
+    def _get_sample_indices(self, strata_cols: list[str]) -> np.ndarray:
+        """ A random (but reproducible) sample of rows of the filtered data, which is shared by all cells and renders """
+        n_max = self._config.plot.matrix_max_points
+        
+        def compute():
+            df = self._config.df
+            strata = None
+            if len(strata_cols) > 0:
+                strata = df.select(pl.struct(strata_cols).rank('dense')).to_series().to_numpy()
+            return sampling.sample_indices(len(df), n_max, strata)
+        
+        return self._config.get_df_cached(('sample', n_max, tuple(strata_cols)), compute)
+
+
+    def _use_webgl(self, n_points: int) -> bool:
+        match self._config.plot.webgl:
+            case WebGlMode.On: return True
+            case WebGlMode.Off: return False
+            case WebGlMode.Auto: return n_points > self._config.plot.webgl_threshold
+        raise ValueError()
+
+
+    def _use_batching(self, n_traces: int) -> bool:
+        match self._config.plot.trace_batching:
+            case TraceBatching.On: return n_traces > 1
+            case TraceBatching.Off: return False
+            case TraceBatching.Auto: return n_traces > self._config.plot.batching_threshold
+        raise ValueError()
+
+
+    @staticmethod
+    def _get_style_key(trace: dict, label: tuple[str,str,str]) -> tuple|None:
+        """ Traces with the same key look the same, and can be merged; None if the trace cannot be merged """
+        if np.ndim(trace['x']) != 1 or np.ndim(trace['y']) != 1:
+            return None  # multi-category axes
+        marker_props = tuple(sorted((k,v) for k,v in trace['marker'].items() if not isinstance(v, np.ndarray)))
+        marker_arrays = tuple(sorted(k for k,v in trace['marker'].items() if isinstance(v, np.ndarray)))
+        fill = (trace.get('fill'), trace.get('fillcolor'))
+        return (label[0], label[1], trace['mode'], tuple(sorted(trace['line'].items())), marker_props, marker_arrays, fill)
+
+
+    def _assign_default_colors(self, traces: list[dict]):
+        """ Sets the colors that Plotly would otherwise pick from its colorway explicitly, so they are part of the style key.
+        
+        Unlike Plotly, which cycles through the colors, consecutive traces get the same color (in as many blocks as
+        there are colors), so that each batch holds a range of groups. Bands get the color of the line they belong to.
+        """
+        lines = [index for index,trace in enumerate(traces) if 'fill' not in trace]
+        n_colors = len(self._color_palette)
+        for position,index in enumerate(lines):
+            trace = traces[index]
+            color = self._color_palette[position * n_colors // max(n_colors, len(lines))]
+            if 'color' not in trace['line']:
+                trace['line'] = trace['line'] | dict(color=color)
+                band = traces[index-1] if index > 0 and 'fill' in traces[index-1] else None
+                if band is not None and band.get('legendgroup') == trace.get('legendgroup'):
+                    band['fillcolor'] = Plot._to_rgba(color, 0.2)  # instead of gray, as there was no common color
+            if 'color' not in trace['marker']:
+                trace['marker'] = trace['marker'] | dict(color=color)
+
+
+    @staticmethod
+    def _concat_with_gaps(parts: list[np.ndarray], *, repeat_last: bool = False) -> np.ndarray:
+        """ Concatenates arrays, with a gap value (or a repetition of the last value) between them """
+        if repeat_last:
+            gaps = [part[-1:] for part in parts]
+        else:
+            kind = np.result_type(*parts).kind
+            if kind in 'biuf':
+                gaps = [np.array([np.nan])] * len(parts)
+            elif kind in 'mM':
+                gaps = [np.array(['NaT'], dtype=parts[0].dtype)] * len(parts)
+            else:
+                gaps = [np.array([None], dtype=object)] * len(parts)
+        interleaved = [array for pair in zip(parts, gaps) for array in pair][:-1]
+        return np.concatenate(interleaved)
 
-    def _get_all_markers(self) -> list:
-        all_symbols = plotly.validators.scatter.marker.SymbolValidator().values
-        symbols_without_numers = [s for s in all_symbols if not re.match(r'^[0-9].*', str(s))]
-        symbols_without_specials = [s for s in symbols_without_numers if '-' not in s]
-        return symbols_without_specials
-    
 
-    def _get_discrete_color(self, col):
-        if col not in self._color_map:
-            available = self._get_color_swatch()
-            self._color_map[col] = available[len(self._color_map) % len(available)]
-        return self._color_map[col]
+    def _batch_traces(self, traces: list[dict], labels: list[tuple[str,str,str]]) -> list[dict]:
+        """ Merges all traces with the same style into one trace, separated by gaps.
+        
+        Plotly renders a few large traces much faster than thousands of small ones. The group of each point
+        is kept in <customdata>, so it is still shown on hover; the legend shows one entry per style.
+        """
+
+        batches: dict[tuple,list[int]] = {}
+        for index,(trace,label) in enumerate(zip(traces, labels)):
+            key = Plot._get_style_key(trace, label)
+            batches.setdefault(key if key is not None else ('unmergeable', index), []).append(index)
+
+        batched_traces = []
+        trace_sources = {}
+        for indices in batches.values():
+            if len(indices) == 1:
+                # nothing to merge; keep the trace as it is (including its re-query source)
+                if indices[0] in self.resampler.trace_sources:
+                    trace_sources[len(batched_traces)] = self.resampler.trace_sources[indices[0]]
+                batched_traces.append(traces[indices[0]])
+                continue
+            
+            members = [traces[i] for i in indices]
+            prefix, style_description, _ = labels[indices[0]]
+            group_names = np.array([labels[i][2] for i in indices], dtype=object)
+            lengths = np.array([len(trace['x']) for trace in members])
+            # every point (and the gap after it) refers to the name of its group
+            customdata = group_names[np.repeat(np.arange(len(members)), lengths + 1)[:-1]]
+            customdata[np.cumsum(lengths + 1)[:-1] - 1] = None
+
+            # each batch holds a range of groups (see <_assign_default_colors()>), which identifies it in the legend
+            name = ' '.join([s for s in [prefix, style_description, f'{group_names[0]} … {group_names[-1]}'] if s != ''])
+            marker = {k: v for k,v in members[0]['marker'].items() if not isinstance(v, np.ndarray)}
+            for k,v in members[0]['marker'].items():
+                if isinstance(v, np.ndarray):
+                    marker[k] = Plot._concat_with_gaps([trace['marker'][k] for trace in members], repeat_last=True)
+            
+            batched_traces.append(dict(
+                x = Plot._concat_with_gaps([trace['x'] for trace in members]),
+                y = Plot._concat_with_gaps([trace['y'] for trace in members]),
+                name = f'{name} ({len(members)} groups)',
+                legendgroup = name,
+                mode = members[0]['mode'],
+                line = members[0]['line'],
+                marker = marker,
+                customdata = customdata,
+                hovertemplate = '%{customdata}<br>(%{x}, %{y})<extra>%{fullData.name}</extra>',
+                **{k: members[0][k] for k in ['fill', 'fillcolor', 'showlegend', 'hoverinfo'] if k in members[0]},
+            ))
+        
+        self.resampler.trace_sources = trace_sources
+        return batched_traces
 
 
-    def _get_discrete_marker(self, col):
-        if col not in self._marker_map:
-            available = self._get_all_markers()
-            self._marker_map[col] = available[len(self._marker_map) % len(available)]
-        return self._marker_map[col]
+    def _to_webgl(self, trace: dict) -> dict:
+        """ Maps the styles of an SVG scatter trace to ones that are supported by WebGL """
+        
+        all_markers = self._marker_palette.astype(str)
+        # the palette starts with the WebGL symbols, so the remaining ones wrap around as if the palette only had those
+        webgl_markers = np.array([str(m) if m in Plot.WEBGL_MARKERS else Plot.WEBGL_MARKERS[i % len(Plot.WEBGL_MARKERS)] for i,m in enumerate(all_markers)], dtype=object)
+        
+        marker = dict(trace.get('marker', {}))
+        if 'symbol' in marker:
+            # look up the index of each symbol in the palette, and use the WebGL-symbol at the same index instead
+            sorter = np.argsort(all_markers)
+            symbols = np.atleast_1d(np.asarray(marker['symbol']).astype(str))
+            mapped = webgl_markers[sorter[np.searchsorted(all_markers, symbols, sorter=sorter)]]
+            marker['symbol'] = mapped[0] if isinstance(marker['symbol'], str) else mapped
+        
+        line = dict(trace.get('line', {}))
+        if 'dash' in line and line['dash'] not in Plot.WEBGL_DASHES:
+            line['dash'] = 'dash'  # custom dash patterns are not supported
+        
+        return trace | dict(marker=marker, line=line)
+
 
+    @property
+    def _color_palette(self) -> np.ndarray:
+        if Plot._colors is None:
+            Plot._colors = np.array(plotly.express.colors.qualitative.Plotly, dtype=object)
+        return Plot._colors
+    
 
-    def _get_relative_value(self, col, value):
+    @property
+    def _marker_palette(self) -> np.ndarray:
+        if Plot._markers is None:
+            all_symbols = plotly.validators.scatter.marker.SymbolValidator().values
+            symbols_without_numers = [s for s in all_symbols if not re.match(r'^[0-9].*', str(s))]
+            symbols_without_specials = [s for s in symbols_without_numers if '-' not in s]
+            # symbols that WebGL supports come first, so the first values get the same symbol in both renderers
+            symbols_webgl_first = sorted(symbols_without_specials, key=lambda s: s not in Plot.WEBGL_MARKERS)
+            Plot._markers = np.array(symbols_webgl_first, dtype=object)
+        return Plot._markers
+    
+
+    def _encode_discrete(self, col: str, n_codes: int) -> pl.Expr:
+        """ Maps each value to an index into a palette of <n_codes> entries.
+        
+        The index is based on the sorted values of the whole (unfiltered) dataset, so the mapping is the
+        same for all groups, and does not change between renders. Nulls are sorted last, and get their own index.
+        """
+        def compute():
+            return self._config.raw_df.get_column(col).drop_nulls().unique().sort()
+        all_values = self._config.get_df_cached(('discrete_values', col), compute)
+        codes = pl.Series([i % n_codes for i in range(len(all_values))], dtype=pl.UInt32)
+        null_code = len(all_values) % n_codes
+        return pl.when(pl.col(col).is_null()).then(pl.lit(null_code, dtype=pl.UInt32)).otherwise(pl.col(col).replace_strict(all_values, codes, default=0, return_dtype=pl.UInt32))
+
+
+    def _get_relative_values(self, col: str, values: np.ndarray) -> np.ndarray:
         if col not in self._range_map:
-            all_values = self._config.get_column_values(col)
-            lo, hi = np.min(all_values), np.max(all_values)
-            self._range_map[col] = (lo, hi)
+            all_values = self._config.raw_df.get_column(col)
+            self._range_map[col] = (all_values.min(), all_values.max())
         (lo, hi) = self._range_map[col]
         if lo==hi:
-            return 0.5
-        return (value - lo) / (hi-lo)
+            return np.full(len(values), 0.5)
+        return (values - lo) / (hi-lo)
 
 
-    def _get_axis_values(self, df: pl.DataFrame, cols: list[str]) -> tuple[np.ndarray,bool]:
-        if len(cols) > 1:
-            values = np.array([df.get_column(col).to_numpy() for col in cols])
-            n_total = max(*[len(x1) for x1 in values])
-            n_unique_per_group = [len(np.unique(x1)) for x1 in values]
 
-        else:
-            values = df.get_column(cols[0]).to_numpy()
-            n_total = len(values)
-            n_unique_per_group = [len(np.unique(values))]
 
-        n_expected_total = np.prod(n_unique_per_group)
-        if n_total == n_expected_total:
-            unique = True
+    def _get_group_partitions(self, group_cols: list[str]) -> tuple[pl.DataFrame,list[tuple],np.ndarray]:
+        """ Returns the filtered data, re-ordered so that the rows of each group are contiguous, the key of each group, and the row offsets of the groups.
+        
+        The groups appear in the order of their first row, and each group keeps the order of its rows (like
+        <group_by(..., maintain_order=True)>). The result is cached with the filtered data, so re-renders that
+        only change styles do not have to partition the data again.
+        """
+        
+        def compute():
+            df = self._config.df
+            if len(group_cols) == 0:
+                return df, [tuple()], np.array([0, len(df)])
+            groups = df.select(group_cols) \
+                .with_row_index('_partition_row') \
+                .group_by(group_cols, maintain_order=True) \
+                .agg(pl.col('_partition_row'))
+            rows = groups.get_column('_partition_row')
+            offsets = np.concatenate([[0], np.cumsum(rows.list.len().to_numpy(), dtype=np.int64)])
+            return df[rows.explode().to_numpy()], groups.select(group_cols).rows(), offsets
+        
+        return self._config.get_df_cached(('group-partitions', tuple(group_cols)), compute)
+
+
+    def _aggregate(self, df: pl.DataFrame, group_offsets: np.ndarray, x_col: str, y_cols: list[str], style_cols: list[str]) -> tuple[pl.DataFrame,np.ndarray]:
+        """ Summarizes the Y-values of each group at each X-value (e.g. mean and standard deviation), in one group_by for all groups.
+        
+        Expects and returns a frame with the rows of each group being contiguous (see <_get_group_partitions()>),
+        plus the row offsets of the groups. For each Y-column, the summary is stored in the column itself, and the
+        band (if any) in the columns "_lo_<col>" and "_hi_<col>". Style columns keep the first value.
+        """
+        
+        config = self._config.plot
+        aggs = []
+        for y_col in y_cols:
+            y = pl.col(y_col)
+            center = y.median() if config.aggregation == Aggregation.Median else y.mean()
+            aggs.append(center.alias(y_col))
+            match config.aggregation_band:
+                case AggregationBand.Off: continue
+                case AggregationBand.Std: lo, hi = center - y.std().fill_null(0), center + y.std().fill_null(0)
+                case AggregationBand.MinMax: lo, hi = y.min(), y.max()
+                case AggregationBand.Percentile: lo, hi = y.quantile(config.aggregation_percentile/100, 'linear'), y.quantile(1-config.aggregation_percentile/100, 'linear')
+                case _: raise ValueError()
+            aggs += [lo.alias(f'_lo_{y_col}'), hi.alias(f'_hi_{y_col}')]
+        aggs += [pl.col(col).first() for col in style_cols if col not in y_cols and col != x_col]
+
+        n_groups = len(group_offsets) - 1
+        group_index = pl.Series('_group_index', np.repeat(np.arange(n_groups), np.diff(group_offsets)))
+        aggregated = df.with_columns(group_index) \
+            .group_by('_group_index', x_col) \
+            .agg(aggs) \
+            .sort('_group_index', x_col)
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(aggregated.get_column('_group_index').to_numpy(), minlength=n_groups), dtype=np.int64)])
+        logging.debug(f'Aggregated {len(df)} rows to {len(aggregated)}')
+        return aggregated, offsets
+
+
+    @staticmethod
+    def _to_rgba(color: str, alpha: float) -> str:
+        """ Converts a color like "#1f77b4" to "rgba(31,119,180,<alpha>)" """
+        r, g, b = [int(color[i:i+2], 16) for i in (1, 3, 5)]
+        return f'rgba({r},{g},{b},{alpha})'
+
+
+    def _get_axis_values(self, df: pl.DataFrame, cols: list[str]) -> np.ndarray:
+        if len(cols) > 1:
+            return np.array([df.get_column(col).to_numpy() for col in cols])
         else:
-            cols_str = '"' + '"/"'.join(cols) + '"'
-            logging.warning(f'In the axis values of column {cols_str}, there are {n_total} values, but only {n_expected_total} unique; you probably forgot some grouping or filtering')
-            unique = False
+            return df.get_column(cols[0]).to_numpy()
+
+
+    def _get_axis_uniqueness(self, group_cols: list[str], cols: list[str]) -> dict[tuple,bool]:
+        """ For each group (tuple of group values), whether the axis values form a grid without duplicates, so that lines can be drawn.
         
-        return values, unique
+        This is computed for all groups at once, and cached with the filtered data, so it is skipped by
+        re-renders that only change styles.
+        """
+
+        def compute():
+            df = self._config.df
+            aggs = [pl.len().alias('_n_total')] + [pl.col(col).n_unique().alias(f'_n_unique_{i}') for i,col in enumerate(cols)]
+            stats = df.group_by(group_cols).agg(aggs) if len(group_cols) > 0 else df.select(aggs)
+            n_expected = stats.select(math.prod([pl.col(f'_n_unique_{i}').cast(pl.Float64) for i in range(len(cols))])).to_series()
+            unique = (stats.get_column('_n_total') == n_expected).to_list()
+            keys = stats.select(group_cols).rows() if len(group_cols) > 0 else [tuple()]
+
+            n_not_unique = len(unique) - sum(unique)
+            if n_not_unique > 0:
+                cols_str = '"' + '"/"'.join(cols) + '"'
+                logging.warning(f'In the axis values of column {cols_str}, {n_not_unique} of {len(unique)} group(s) contain duplicates; you probably forgot some grouping or filtering')
+            return dict(zip(keys, unique))
+        
+        return self._config.get_df_cached(('axis-uniqueness', tuple(group_cols), tuple(cols)), compute)
+
+    
+    def _make_uirevision(self, *cols_per_axis: list[str]) -> str:
+        """ The view (e.g. zoom) is kept between re-renders as long as the plot type and axis columns are the same """
+        return '/'.join([self._config.plot.type] + ['|'.join(cols) for cols in cols_per_axis])
 
     
     def _make_title(self, config_str: str, cols: list[str]) -> str:
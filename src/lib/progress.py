@@ -0,0 +1,64 @@
+import time
+import threading
+import polars as pl
+from typing import Callable
+
+
+
+class Cancelled(Exception):
+    pass
+
+
+
+class Progress:
+    """ Token that is passed through long-running operations, to report progress and to cancel them cooperatively.
+
+    The operation calls <report()> (or <check()>) regularly, which raises <Cancelled> once <cancel()> was called,
+    e.g. from another thread. Reports are forwarded to the callback (at most every <interval> seconds), which is
+    called with a message and the completed fraction (or None, if unknown).
+    """
+
+
+    def __init__(self, callback: Callable[[str,float|None],None]|None = None, interval: float = 0.05):
+        self._callback = callback
+        self._interval = interval
+        self._cancelled = threading.Event()
+        self._last_report = 0.0
+
+
+    def cancel(self):
+        self._cancelled.set()
+
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+
+    def check(self):
+        if self._cancelled.is_set():
+            raise Cancelled()
+
+
+    def report(self, message: str, fraction: float|None = None, *, force: bool = False):
+        self.check()
+        if self._callback is None:
+            return
+        now = time.monotonic()
+        if force or now - self._last_report >= self._interval:
+            self._last_report = now
+            self._callback(message, fraction)
+
+
+    def collect(self, df: pl.LazyFrame, poll_interval: float = 0.005) -> pl.DataFrame:
+        """ Collects the frame in the background, so that the query can be aborted when cancelled """
+        self.check()
+        query = df.collect(background=True)
+        while True:
+            result = query.fetch()
+            if result is not None:
+                return result
+            if self._cancelled.is_set():
+                query.cancel()
+                raise Cancelled()
+            time.sleep(poll_interval)
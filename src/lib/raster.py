@@ -0,0 +1,118 @@
+import zlib
+import struct
+import base64
+import numpy as np
+import polars as pl
+
+
+
+def get_range(df: pl.DataFrame, col: str) -> tuple[float,float]:
+    values = df.get_column(col).to_physical().cast(pl.Float64)
+    values = values.filter(values.is_finite())
+    if len(values) == 0:
+        return 0.0, 1.0
+    lo, hi = float(values.min()), float(values.max())
+    if not hi > lo:
+        lo, hi = lo - 0.5, hi + 0.5
+    return lo, hi
+
+
+def aggregate(df: pl.DataFrame, x_col: str, y_col: str, x_range: tuple[float,float], y_range: tuple[float,float], width: int, height: int,
+        *, value_col: str|None = None, category_col: str|None = None, n_categories: int = 0) -> tuple[np.ndarray,np.ndarray|None]:
+    """ Counts the points that fall into each pixel of a <width>x<height> canvas.
+
+    Returns the counts (shape height x width, or n_categories x height x width if <category_col> contains category
+    indices), and the mean of <value_col> per pixel (or None). Row 0 is the bottom of the canvas.
+    """
+
+    (x0, x1), (y0, y1) = x_range, y_range
+    x = pl.col(x_col).to_physical().cast(pl.Float64)
+    y = pl.col(y_col).to_physical().cast(pl.Float64)
+    px = ((x - x0) / (x1 - x0) * width).floor().clip(0, width-1).cast(pl.Int64)
+    py = ((y - y0) / (y1 - y0) * height).floor().clip(0, height-1).cast(pl.Int64)
+    pixel = py * width + px
+    n_bins = width * height
+    if category_col is not None:
+        pixel = pixel + pl.col(category_col).cast(pl.Int64) * n_bins
+        n_bins *= n_categories
+    columns = [pixel.alias('_pixel')]
+    if value_col is not None:
+        columns.append(pl.col(value_col).cast(pl.Float64).alias('_value'))
+
+    # the expensive per-point arithmetic runs on all cores in polars; the counting itself is a single pass
+    pixels = df.lazy() \
+        .filter(x.is_between(x0, x1) & y.is_between(y0, y1)) \
+        .select(columns) \
+        .collect()
+    pixel_indices = pixels.get_column('_pixel').to_numpy()
+
+    shape = (height, width) if category_col is None else (n_categories, height, width)
+    counts = np.bincount(pixel_indices, minlength=n_bins).astype(np.float64).reshape(shape)
+
+    means = None
+    if value_col is not None:
+        values = pixels.get_column('_value').to_numpy()
+        valid = np.isfinite(values)
+        valid_pixels = pixel_indices[valid] % (width*height)
+        sums = np.bincount(valid_pixels, weights=values[valid], minlength=width*height).reshape(height, width)
+        n_values = np.bincount(valid_pixels, minlength=width*height).reshape(height, width)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            means = np.where(n_values > 0, sums / n_values, np.nan)
+
+    return counts, means
+
+
+def _hex_to_rgb(colors: list[str]) -> np.ndarray:
+    return np.array([[int(c[i:i+2], 16) for i in (1, 3, 5)] for c in colors], dtype=np.float64)
+
+
+def _apply_colormap(values: np.ndarray, colormap: list[str]) -> np.ndarray:
+    """ Maps values in [0,1] to RGB, by interpolating the colors of <colormap> (hex strings) """
+    stops = _hex_to_rgb(colormap)
+    positions = np.linspace(0, 1, len(stops))
+    return np.stack([np.interp(values, positions, stops[:,channel]) for channel in range(3)], axis=-1)
+
+
+def shade(counts: np.ndarray, colormap: list[str], *, means: np.ndarray|None = None, category_colors: list[str]|None = None) -> np.ndarray:
+    """ Converts the result of <aggregate()> into an RGBA image (row 0 at the top); empty pixels are transparent.
+
+    Counts are shown on a logarithmic scale; means on a linear scale. With categories, the color of each pixel is
+    the mix of the category colors, weighted by their counts, and its opacity shows the (logarithmic) total count.
+    """
+
+    total = counts if counts.ndim == 2 else np.sum(counts, axis=0)
+    filled = total > 0
+    max_count = np.max(total) if np.any(filled) else 1
+    density = np.log1p(total) / np.log1p(max_count)
+
+    if category_colors is not None:
+        colors = _hex_to_rgb(category_colors)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rgb = np.einsum('chw,cd->hwd', counts, colors) / total[...,np.newaxis]
+        alpha = 64 + 191 * density
+    elif means is not None:
+        lo, hi = (np.nanmin(means), np.nanmax(means)) if np.any(filled) else (0, 1)
+        rgb = _apply_colormap((means - lo) / (hi - lo) if hi > lo else np.full(means.shape, 0.5), colormap)
+        alpha = np.full(total.shape, 255.0)
+    else:
+        rgb = _apply_colormap(density, colormap)
+        alpha = np.full(total.shape, 255.0)
+
+    rgba = np.concatenate([np.nan_to_num(rgb), alpha[...,np.newaxis]], axis=-1)
+    rgba[~filled] = 0
+    return np.flipud(np.round(rgba).astype(np.uint8))
+
+
+def to_png_data_uri(rgba: np.ndarray) -> str:
+    """ Encodes an RGBA image (height x width x 4, uint8) as PNG """
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    height, width, _ = rgba.shape
+    rows = np.concatenate([np.zeros((height, 1), dtype=np.uint8), rgba.reshape(height, width*4)], axis=1)  # filter type 0 per row
+    png = b'\x89PNG\r\n\x1a\n' \
+        + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0)) \
+        + chunk(b'IDAT', zlib.compress(rows.tobytes(), 6)) \
+        + chunk(b'IEND', b'')
+    return 'data:image/png;base64,' + base64.b64encode(png).decode('ascii')
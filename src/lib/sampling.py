@@ -0,0 +1,39 @@
+import numpy as np
+
+
+
+SEED = 0
+
+
+
+def sample_indices(n_rows: int, n_max: int, strata: np.ndarray|None = None, seed: int = SEED) -> np.ndarray:
+    """ Draws up to <n_max> distinct row indices (in ascending order), without replacement.
+
+    If <strata> is given (one integer stratum-ID per row, e.g. the file or a category), each stratum gets a share
+    of the budget that is proportional to its size, so that small strata are represented as well as with uniform sampling on average,
+    but without random fluctuations. The sample only depends on the inputs and the seed, so it is the same
+    on every render.
+    """
+
+    if n_rows <= n_max:
+        return np.arange(n_rows)
+    rng = np.random.default_rng(seed)
+    if strata is None:
+        return np.sort(rng.choice(n_rows, size=n_max, replace=False))
+
+    _, strata = np.unique(strata, return_inverse=True)
+    counts = np.bincount(strata)
+
+    # proportional quotas; the remaining budget goes to the strata with the largest fractional parts (ties are broken randomly)
+    exact = counts * (n_max / n_rows)
+    quotas = np.floor(exact).astype(np.int64)
+    remainder = n_max - np.sum(quotas)
+    if remainder > 0:
+        shuffled = rng.permutation(len(counts))
+        quotas[shuffled[np.argsort((quotas - exact)[shuffled], kind='stable')[:remainder]]] += 1
+
+    # shuffle the rows within each stratum, and keep the first <quota> of each
+    order = np.lexsort((rng.random(n_rows), strata))
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    rank = np.arange(n_rows) - starts[strata[order]]
+    return np.sort(order[rank < quotas[strata[order]]])
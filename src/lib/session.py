@@ -0,0 +1,96 @@
+from .config import Config
+from . import typed_json
+
+import os
+import json
+import logging
+import tempfile
+import polars as pl
+import pyarrow as pa
+import pyarrow.ipc
+
+
+
+EXTENSION = '.cdvsession'
+FORMAT_VERSION = 'Configurable Data Visualizer Session v0.1'
+
+
+
+class Session:
+    """ A config, together with its loaded data (<raw_df>) and the last figure, stored in a single Arrow IPC file.
+
+    The data is the content of the file, and everything else is stored in the schema metadata. Uncompressed files
+    are memory-mapped when opened, so opening takes about the same time regardless of the size of the data. The
+    input files are not touched when opening; the pipeline checks them when it runs the load stage, and only
+    re-loads them if they have changed (files that do not exist, e.g. on another machine, are ignored).
+    """
+
+
+    def __init__(self, config: Config, figure: dict|None = None, fingerprint: str|None = None):
+        self.config = config
+        self.figure = figure
+        self.fingerprint = fingerprint  # of the config when the figure was rendered, see <Config.fingerprint()>
+
+
+    @staticmethod
+    def save(path: str, config: Config, figure: dict|None = None, fingerprint: str|None = None, compression: str|None = None):
+        """ Saves the config with its data; <compression> ("lz4" or "zstd") makes the file smaller, but it can then no longer be memory-mapped.
+
+        The figure is only shown again for the same config if <fingerprint> is that of the config it was rendered from
+        (see <Pipeline.figure_fingerprint>), which may differ from <config> while it is still being re-rendered.
+        """
+
+        metadata = {
+            'cdv.format': FORMAT_VERSION,
+            'cdv.config': json.dumps(config._serialize()),
+            'cdv.source': json.dumps(config.raw_df_source if config.raw_df_source is not None else config.get_input_state()),
+            'cdv.column_values': json.dumps(Session._get_column_values(config)),
+        }
+        if figure is not None:
+            metadata['cdv.figure'] = typed_json.to_json(figure, strict=True)
+        if figure is not None and fingerprint is not None:
+            metadata['cdv.fingerprint'] = fingerprint
+
+        table = config.raw_df.to_arrow()
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), **metadata})
+
+        path = os.path.abspath(path)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.' + os.path.basename(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as fp:
+                options = pa.ipc.IpcWriteOptions(compression=compression)
+                with pa.ipc.new_file(fp, table.schema, options=options) as writer:
+                    writer.write_table(table)
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+
+    @staticmethod
+    def open(path: str) -> 'Session':
+        with pa.memory_map(path, 'r') as source:
+            table = pa.ipc.open_file(source).read_all()
+        metadata = {k.decode('utf-8'): v.decode('utf-8') for k,v in (table.schema.metadata or {}).items()}
+
+        format_version_str = metadata.get('cdv.format')
+        if format_version_str is None:
+            raise RuntimeError(f'<{path}> is not a session file')
+        if format_version_str != FORMAT_VERSION:
+            logging.warning(f'Expected session format "{FORMAT_VERSION}", but <{path}> contains "{format_version_str}", ignoring')
+
+        config = Config._deserialize(json.loads(metadata['cdv.config']))
+        config.raw_df = pl.from_arrow(table.replace_schema_metadata(None), rechunk=False)
+        config.ensure_setups_exist()
+        config.raw_df_source = json.loads(metadata['cdv.source'])
+        config._column_values.update(json.loads(metadata.get('cdv.column_values', '{}')))
+
+        figure = json.loads(metadata['cdv.figure']) if 'cdv.figure' in metadata else None
+        return Session(config, figure, metadata.get('cdv.fingerprint'))
+
+
+    @staticmethod
+    def _get_column_values(config: Config) -> dict[str,list]:
+        # the unique values of the columns that were already looked at, unless they cannot be restored from JSON
+        return {col: values for col,values in config._column_values.items() if all(isinstance(value, (str,int,float,bool)) for value in values)}
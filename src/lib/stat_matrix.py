@@ -0,0 +1,45 @@
+import numpy as np
+import polars as pl
+
+
+
+class StatMatrix:
+    """ Statistics of a set of columns, as needed by the cells of a scatter matrix.
+
+    The columns are extracted only once, into one contiguous 2D array (one row per column); all pairwise
+    regressions are derived from a single covariance matrix, and the quantiles are computed once per column.
+    """
+
+
+    N_QUANTILES = 101
+
+
+    def __init__(self, df: pl.DataFrame, cols: list[str]):
+        self.cols = cols
+        self.data = np.ascontiguousarray(df.select([pl.col(col).cast(pl.Float64) for col in cols]).to_numpy().T)
+
+        self.min = np.min(self.data, axis=1)
+        self.max = np.max(self.data, axis=1)
+        self.mean = np.mean(self.data, axis=1)
+        self.cov = np.atleast_2d(np.cov(self.data, ddof=1))
+        self.std = np.sqrt(np.diag(self.cov))
+        self.quantiles = np.percentile(self.data, np.linspace(0, 100, StatMatrix.N_QUANTILES), axis=1).T
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # slope[x,y] is the slope of the regression of column y over column x
+            self.slope = self.cov / np.diag(self.cov)[:,np.newaxis]
+        self.intercept = self.mean[np.newaxis,:] - self.slope * self.mean[:,np.newaxis]
+
+
+    @property
+    def n_rows(self) -> int:
+        return self.data.shape[1]
+
+
+    def column(self, i: int) -> np.ndarray:
+        return self.data[i]
+
+
+    def regression(self, x: int, y: int) -> tuple[float,float]:
+        """ Returns (slope, intercept) of the linear regression of column <y> over column <x> """
+        return self.slope[x,y], self.intercept[x,y]
@@ -0,0 +1,72 @@
+import json
+import base64
+import numpy as np
+import plotly.utils
+
+
+
+class TypedArrayJSONEncoder(plotly.utils.PlotlyJSONEncoder):
+    """ JSON encoder that ships numeric NumPy arrays as base64-encoded typed arrays.
+
+    Plotly.js (since v2.28) decodes objects like {"dtype": "f8", "bdata": "...", "shape": "2, 100"} by itself,
+    so the numbers neither have to be converted to Python lists, nor formatted and parsed as decimal text.
+
+    With <strict>, non-finite scalars are written as null (like PlotlyJSONEncoder does), so the output is valid JSON
+    for other readers, e.g. when it is saved to a file.
+    """
+
+
+    DTYPES = {
+        np.dtype(np.int8): 'i1', np.dtype(np.uint8): 'u1',
+        np.dtype(np.int16): 'i2', np.dtype(np.uint16): 'u2',
+        np.dtype(np.int32): 'i4', np.dtype(np.uint32): 'u4',
+        np.dtype(np.float32): 'f4', np.dtype(np.float64): 'f8',
+    }
+
+
+    def __init__(self, *args, strict: bool=False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.strict = strict
+
+
+    def encode(self, o):
+        if self.strict:
+            return super().encode(o)
+        # unlike PlotlyJSONEncoder, do not re-parse the whole output just because "NaN" appears somewhere (which it
+        # will in long base64-strings); non-finite numbers are only left in scalars, and are valid JavaScript anyway
+        return json.JSONEncoder.encode(self, o)
+
+
+    def default(self, obj):
+        if isinstance(obj, np.ndarray) and obj.size > 0:
+            array = TypedArrayJSONEncoder._to_supported_dtype(obj)
+            if array is not None:
+                spec = dict(
+                    dtype = TypedArrayJSONEncoder.DTYPES[array.dtype],
+                    bdata = base64.b64encode(np.ascontiguousarray(array).astype(array.dtype.newbyteorder('<'), copy=False).tobytes()).decode('ascii'),
+                )
+                if array.ndim > 1:
+                    spec['shape'] = ', '.join([str(n) for n in array.shape])
+                return spec
+        return super().default(obj)
+
+
+    @staticmethod
+    def _to_supported_dtype(array: np.ndarray) -> np.ndarray|None:
+        if array.dtype in TypedArrayJSONEncoder.DTYPES:
+            return array
+        if np.issubdtype(array.dtype, np.bool_):
+            return array.astype(np.uint8)
+        if np.issubdtype(array.dtype, np.integer):
+            # 64-bit integers are not supported by Plotly.js
+            if array.min() >= np.iinfo(np.int32).min and array.max() <= np.iinfo(np.int32).max:
+                return array.astype(np.int32)
+            return array.astype(np.float64)
+        if np.issubdtype(array.dtype, np.floating):
+            return array.astype(np.float64)
+        return None  # e.g. strings or dates; must be sent as plain JSON
+
+
+
+def to_json(obj, strict: bool=False) -> str:
+    return json.dumps(obj, cls=TypedArrayJSONEncoder, strict=strict)
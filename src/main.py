@@ -1,31 +1,75 @@
-from gui.main_window_manager import MainWindowManager
 from lib.config import Config
+from lib.session import Session, EXTENSION as SESSION_EXTENSION
+from lib import batch
 
-from PyQt6 import QtWidgets
-
+import os
 import sys
+import pathlib
+import argparse
 import logging
+import tempfile
+
+
+def run_gui(config_file: str|None):
+
+    from gui.main_window_manager import MainWindowManager
+    from PyQt6 import QtWidgets
+
+    app = QtWidgets.QApplication(sys.argv)
+
+    if config_file and config_file.endswith(SESSION_EXTENSION):
+        try:
+            session = Session.open(config_file)
+            session.config.filename = str(pathlib.Path(config_file).with_suffix('.json'))
+            manager = MainWindowManager()
+            manager.show_session(session)
+            app.exec()
+            return
+        except Exception as ex:
+            logging.error(f'Unable to open session <{config_file}> ({ex})')
+
+    config = Config()
+    if config_file:
+        try:
+            config = Config().load(config_file)
+            config.filename = config_file
+        except Exception as ex:
+            logging.error(f'Unable to load <{config_file}> ({ex})')
+
+    MainWindowManager().show_files(config)
+    app.exec()
+
+
+def run_batch(args: argparse.Namespace):
+
+    if not args.config:
+        raise RuntimeError('A config file is required for batch processing')
+    parse_cache_dir = args.cache_dir or os.path.join(tempfile.gettempdir(), 'cdv-parse-cache')
+    reports = batch.run_batch(args.config, args.batch, args.output_dir, args.format, jobs=args.jobs, parse_cache_dir=parse_cache_dir)
+    print(batch.format_report(reports))
+    if any(report['status'] != 'ok' for report in reports):
+        sys.exit(1)
 
 
 if __name__ == '__main__':
 
-    logging.basicConfig(level=logging.DEBUG)
+    parser = argparse.ArgumentParser(description='Configurable Data Visualizer')
+    parser.add_argument('config', nargs='?', help='config file (JSON) or session file (*.cdvsession) to open')
+    parser.add_argument('--batch', nargs='+', metavar='INPUT', help='instead of starting the GUI, apply the config to each INPUT (a directory, which replaces the directory of the config, or a glob pattern of files)')
+    parser.add_argument('-o', '--output-dir', default='.', help='directory for the batch outputs')
+    parser.add_argument('-f', '--format', nargs='+', choices=batch.FORMATS, default=['html'], help='batch output formats (figure as HTML or JSON, filtered data as Parquet)')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='number of parallel batch processes (default: number of CPUs)')
+    parser.add_argument('--cache-dir', default=None, help='directory to cache parsed files in, shared by all batch processes')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.batch else logging.DEBUG)
 
     try:
-        app = QtWidgets.QApplication(sys.argv)
-        filenames = sys.argv[1:]
-
-        config = Config()
-        if len(filenames) >= 1:
-            initial_file = filenames[0]
-            try:
-                config = Config().load(initial_file)
-                config.filename = initial_file
-            except Exception as ex:
-                logging.error(f'Unable to load <{initial_file}> ({ex})')
-        
-        MainWindowManager().show_files(config)
-        app.exec()
+        if args.batch:
+            run_batch(args)
+        else:
+            run_gui(args.config)
 
     except Exception as ex:
         logging.exception(f'Unhandled error: {ex}')
+        sys.exit(1)
@@ -0,0 +1,43 @@
+import sys, pathlib
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent / 'src'))
+
+from lib.config import Config, ConfigColumnSetup, ColumnSwitch
+
+import copy
+import pickle
+
+
+
+def test_copy_after_snapshot():
+    config = Config()
+    switch = ColumnSwitch()
+    switch.col = 'x'
+    config.cols_x = [switch]
+    snap = config.snapshot()
+    for duplicate in [copy.deepcopy, lambda obj: pickle.loads(pickle.dumps(obj))]:
+        other = duplicate(config)
+        assert other.cols_x[0].col == 'x'
+        version = other.version
+        other.cols_x[0].col = 'y'
+        assert other.version > version
+        assert config.cols_x[0].col == 'x'
+        assert duplicate(snap) == snap
+
+
+def test_lookups_follow_setups_and_switches():
+    config = Config()
+    setup = ConfigColumnSetup()
+    setup.col = 'a'
+    config.col_setups.append(setup)
+    switch = ColumnSwitch()
+    switch.col = 'a'
+    config.cols_x = [switch]
+    assert config.find_setup('a') is setup
+    index_version = config.index_version
+    config.plot.scatter_lines = not config.plot.scatter_lines
+    setup.filter.selection.append(1)
+    assert config.index_version == index_version
+    setup.col = 'b'
+    assert config.find_setup('b') is setup
+    switch.active = False
+    assert config.get_active_roles('a') == frozenset()
@@ -0,0 +1,16 @@
+import sys, pathlib
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent / 'src'))
+
+from lib import downsample
+
+import numpy as np
+
+
+
+def test_density_keeps_exactly_the_budget():
+    rng = np.random.default_rng(1)
+    for n in [5001, 20000, 200000]:
+        x, y = rng.normal(size=n), rng.normal(size=n)**3
+        indices = downsample.density_indices(x, y, 5000)
+        assert len(indices) == 5000
+        assert np.all(np.diff(indices) > 0)
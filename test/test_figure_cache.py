@@ -0,0 +1,16 @@
+import sys, pathlib
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent / 'src'))
+
+from lib.figure_cache import FigureCache
+
+import numpy as np
+
+
+
+def test_memory_tier_is_limited_by_bytes():
+    cache = FigureCache(max_entries=16, max_bytes=3*8000)
+    for i in range(5):
+        cache.put(str(i), dict(data=[dict(x=np.zeros(1000))]))
+    assert cache.get('0') is None
+    assert cache.get('4') is not None
+    assert cache._n_bytes <= 3*8000
@@ -0,0 +1,66 @@
+import sys, pathlib
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent / 'src'))
+
+from lib.config import Config, ColumnSwitch
+from lib.plot import Plot
+from lib.figure_diff import diff_figures
+
+import polars as pl
+
+
+
+def _switch(col: str) -> ColumnSwitch:
+    switch = ColumnSwitch()
+    switch.col = col
+    return switch
+
+
+def _make_config() -> Config:
+    config = Config()
+    config.raw_df = pl.DataFrame({
+        'group': [1, 1, 1, 2, 2, 2, 3, 3, 3],
+        'x': [0.0, 1.0, 2.0] * 3,
+        'y': [1.0, 2.0, 3.0, 2.0, 3.0, 4.0, 3.0, 4.0, 5.0],
+    })
+    config.ensure_setups_exist()
+    config.df = config.raw_df
+    config.cols_group = [_switch('group')]
+    config.cols_x = [_switch('x')]
+    config.cols_y = [_switch('y')]
+    return config
+
+
+def _assert_restylable(changes: dict):
+    # Plotly.restyle() throws "cannot set <path> and a parent attribute simultaneously"
+    for path in changes.keys():
+        parts = path.split('.')
+        for n in range(1, len(parts)):
+            assert '.'.join(parts[:n]) not in changes, f'{path} is set together with its parent'
+
+
+def test_color_toggle_is_restylable():
+    config = _make_config()
+    without_color = Plot(config).plot()
+    config.find_setup('group').as_color = True
+    with_color = Plot(config).plot()
+
+    for old,new in [(without_color, with_color), (with_color, without_color)]:
+        diff = diff_figures(old, new)
+        assert diff is not None
+        restyles, relayout = diff
+        assert len(restyles) > 0
+        for _,changes in restyles:
+            _assert_restylable(changes)
+        _assert_restylable(relayout)
+
+
+def test_parent_and_child_change_falls_back_to_react():
+    old = dict(data=[dict(type='scatter', error_y=dict(array=[1.0, 2.0]))], layout={})
+    new = dict(data=[dict(type='scatter', error_y=None)], layout={})  # would set "error_y" and reset "error_y.array"
+    assert diff_figures(old, new) is None
+
+
+def test_empty_dict_is_not_a_leaf():
+    old = dict(data=[dict(type='scatter', line={})], layout={})
+    new = dict(data=[dict(type='scatter', line=dict(color='red'))], layout={})
+    assert diff_figures(old, new) == ([(0, {'line.color': 'red'})], {})
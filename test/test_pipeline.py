@@ -0,0 +1,39 @@
+import sys, pathlib
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent / 'src'))
+
+from lib.config import Config, ColumnSwitch
+from lib.pipeline import Pipeline
+
+
+
+def _switch(col: str) -> ColumnSwitch:
+    switch = ColumnSwitch()
+    switch.col = col
+    return switch
+
+
+def _make_config(tmp_path: pathlib.Path) -> Config:
+    path = tmp_path / 'data.csv'
+    path.write_text('x,y\n' + ''.join([f'{i},{i*i}\n' for i in range(10)]))
+    config = Config()
+    config.input.files = [str(path)]
+    config.cols_x = [_switch('x')]
+    config.cols_y = [_switch('y')]
+    return config
+
+
+def test_run_on_fresh_config(tmp_path):
+    config = _make_config(tmp_path)
+    figure = Pipeline(config).run()
+    assert figure is not None
+    assert {'x', 'y'} <= set([setup.col for setup in config.col_setups])
+
+
+def test_run_with_snapshot_does_not_change_config(tmp_path):
+    config = _make_config(tmp_path)
+    version = config.version
+    figure = Pipeline(config).run(snap=config.snapshot())
+    assert figure is not None
+    assert config.version == version
+    config.ensure_setups_exist()
+    assert {'x', 'y'} <= set([setup.col for setup in config.col_setups])
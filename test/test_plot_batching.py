@@ -0,0 +1,36 @@
+import sys, pathlib
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent / 'src'))
+
+from lib.config import Config, ColumnSwitch, TraceBatching
+from lib.plot import Plot
+
+import numpy as np
+import polars as pl
+
+
+
+def _switch(col: str) -> ColumnSwitch:
+    switch = ColumnSwitch()
+    switch.col = col
+    return switch
+
+
+def test_batches_have_distinct_names():
+    n_groups = 40
+    config = Config()
+    config.raw_df = pl.DataFrame({
+        'group': np.repeat(np.arange(n_groups), 3),
+        'x': np.tile([0.0, 1.0, 2.0], n_groups),
+        'y': np.arange(3*n_groups, dtype=float),
+    })
+    config.ensure_setups_exist()
+    config.df = config.raw_df
+    config.cols_group = [_switch('group')]
+    config.cols_x = [_switch('x')]
+    config.cols_y = [_switch('y')]
+    config.plot.trace_batching = TraceBatching.On
+    traces = Plot(config).plot()['data']
+    assert 1 < len(traces) < n_groups
+    names = [trace['name'] for trace in traces]
+    assert len(set(names)) == len(names)
+    assert len(set([trace['legendgroup'] for trace in traces])) == len(traces)
@@ -0,0 +1,15 @@
+import sys, pathlib
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent / 'src'))
+
+from lib.config import Config
+from lib.plot import Plot
+
+
+
+def test_webgl_symbols_are_distinct():
+    plot = Plot(Config())
+    palette = plot._marker_palette
+    n = len(Plot.WEBGL_MARKERS)
+    symbols = plot._to_webgl(dict(marker=dict(symbol=palette.copy())))['marker']['symbol']
+    assert len(set(symbols[:n])) == n
+    assert list(symbols[:n]) == list(palette[:n])
@@ -0,0 +1,17 @@
+import sys, pathlib
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent / 'src'))
+
+from lib.plot import TraceSource
+
+import numpy as np
+
+
+
+def test_date_range():
+    x = np.arange('2024-01-01T00:00', '2024-01-01T10:00', dtype='datetime64[m]').astype('datetime64[us]')
+    source = TraceSource(dict(x=x, y=np.arange(len(x), dtype=float)), use_lines=True)
+    indices = source.get_indices_in_range(np.datetime64('2024-01-01T02:00'), np.datetime64('2024-01-01T03:00'))
+    assert x[indices[1]] == np.datetime64('2024-01-01T02:00') and x[indices[-2]] == np.datetime64('2024-01-01T03:00')
+    # numeric positions on a date axis are milliseconds
+    ms = lambda s: float(np.datetime64(s, 'ms').astype(np.int64))
+    assert np.array_equal(source.get_indices_in_range(ms('2024-01-01T02:00'), ms('2024-01-01T03:00')), indices)
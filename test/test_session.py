@@ -0,0 +1,31 @@
+import sys, pathlib
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent / 'src'))
+
+from lib.config import Config, ColumnSwitch
+from lib.pipeline import Pipeline
+from lib.session import Session
+
+
+
+def _switch(col: str) -> ColumnSwitch:
+    switch = ColumnSwitch()
+    switch.col = col
+    return switch
+
+
+def test_figure_is_saved_with_its_own_fingerprint(tmp_path):
+    path = tmp_path / 'data.csv'
+    path.write_text('x,y,z\n' + ''.join([f'{i},{i*i},{-i}\n' for i in range(10)]))
+    config = Config()
+    config.input.files = [str(path)]
+    config.cols_x = [_switch('x')]
+    config.cols_y = [_switch('y')]
+    pipeline = Pipeline(config)
+    pipeline.run()
+    rendered_fingerprint = config.fingerprint()
+
+    config.cols_y = [_switch('z')]  # not rendered yet
+    Session.save(str(tmp_path / 'test.cdvsession'), config, pipeline.figure, pipeline.figure_fingerprint)
+    session = Session.open(str(tmp_path / 'test.cdvsession'))
+    assert session.fingerprint == rendered_fingerprint
+    assert session.fingerprint != session.config.fingerprint()